@@ -1,10 +1,13 @@
 import os
+from contextlib import contextmanager, nullcontext
 from datetime import (datetime as dt, timedelta as delta)
 from enum import Enum
 from pathlib import Path
 from time import time
 from collections import defaultdict as dd
+from types import SimpleNamespace
 
+import cloudpickle
 import numpy as np
 import pandas as pd
 
@@ -25,7 +28,7 @@ class Account():
         self.balance = 1
         self.max = 0
         self.min = 1
-        self.txns = list()
+        self.ledger = Ledger()
         self._df_balance = None
 
     def get_balance(self):
@@ -38,15 +41,16 @@ class Account():
         self.balance = balance
 
     def modify(self, xbt, timestamp):
-        txn = Txn()
-        txn.amount = xbt
-        txn.timestamp = timestamp
-        txn.balance_pre = self.balance
-        txn.percentchange = round((xbt / self.balance), 3)
-
-        self.txns.append(txn)
+        balance_pre = self.balance
         self.balance = self.balance + xbt
-        txn.balance_post = self.balance
+
+        self.ledger.append(
+            timestamp=timestamp,
+            amount=xbt,
+            balance_pre=balance_pre,
+            balance_post=self.balance,
+            percentchange=round((xbt / balance_pre), 3))
+
         if self.balance > self.max: self.max = self.balance
         if self.balance < self.min: self.min = self.balance    
 
@@ -59,26 +63,27 @@ class Account():
                 return timestamp.strftime("%V")
 
     def drawdown(self):
-        drawdown = 0.
-        max_seen = 1
-        txmax_seen = self.txns[0]
-        for txn in self.txns:
-            val = txn.balance_pre
-            if val > max_seen:
-                max_seen = val
-                txmax_seen = txn
-
-            curdraw = 1 - val / max_seen
-            if curdraw > drawdown:
-                drawdown = curdraw
-                txlow = txn
-                txhigh = txmax_seen
-        
+        """Return max drawdown (negative) and str of balance/dates at drawdown's high and low"""
+        m = self.ledger.cols()
+        val = m['balance_pre']
+
+        # running max balance, starting at 1
+        max_prev = np.maximum.accumulate(np.r_[1, val])
+        is_new_max = val > max_prev[:-1]
+        curdraw = 1 - val / max_prev[1:]
+
+        # first txn at max drawdown, and last new max balance before it
+        i_low = int(np.argmax(curdraw))
+        drawdown = max(curdraw[i_low], 0)
+        i_high = np.flatnonzero(is_new_max[:i_low + 1])
+        i_high = i_high[-1] if len(i_high) else 0
+
+        timestamps = pd.DatetimeIndex(m['timestamp'])
         drawdates = '{:.2f} ({}) - {:.2f} ({})'.format(
-            txhigh.balance_pre,
-            dt.strftime(txhigh.timestamp, f.time_format()),
-            txlow.balance_pre,
-            dt.strftime(txlow.timestamp, f.time_format()))
+            val[i_high],
+            timestamps[i_high].strftime(f.time_format()),
+            val[i_low],
+            timestamps[i_low].strftime(f.time_format()))
         
         return drawdown * -1, drawdates
     
@@ -87,44 +92,33 @@ class Account():
 
     def print_summary(self, period='month'):
         # TODO: make this include current month
-        data = []
-        cols = ['Period', 'AcctBalance', 'Change', 'PercentChange']
-
-        periodnum = self.get_period_num(self.txns[0].timestamp, period)
-        prevTxn = None
-        prevBalance = 1
-        change = 0.0
+        m = self.ledger.cols()
+        timestamps = pd.DatetimeIndex(m['timestamp'])
+        periodnums = timestamps.month.to_numpy() if period == 'month' else timestamps.strftime('%V').to_numpy()
+
+        # first txn of each new period closes out previous period
+        i_new = np.flatnonzero(periodnums[1:] != periodnums[:-1]) + 1
+        i_prev = np.r_[0, i_new[:-1]]
+        cum_amount = np.r_[0, np.cumsum(m['amount'])]
+        change = cum_amount[i_new] - cum_amount[i_prev]
+        prev_balance = np.r_[1, m['balance_post'][i_new[:-1]]]
+
+        df = pd.DataFrame(dict(
+            Period=periodnums[i_new - 1],
+            AcctBalance=[f'{bal:.3f}' for bal in m['balance_post'][i_new]],
+            Change=change.round(3),
+            PercentChange=[self.get_percent_change(bal, chg) for bal, chg in zip(prev_balance, change)]))
 
-        for t in self.txns:     
-            if self.get_period_num(t.timestamp, period) != periodnum:
-                if prevTxn is None: prevTxn = t
-                data.append([
-                    periodnum,
-                    '{:.{prec}f}'.format(t.balance_post, prec=3),
-                    round(change, 3),
-                    self.get_percent_change(prevBalance, change)
-                ])
-                prevTxn = t
-                prevBalance = t.balance_post
-                change = 0
-                periodnum = self.get_period_num(t.timestamp, period)
-            
-            change += t.amount
-
-        df = pd.DataFrame(data=data, columns=cols)
         display(df)
 
     @property
     def df_balance(self):
-        if self._df_balance is None:
-            m = dd(list)
-
-            for t in self.txns:
-                m['timestamp'].append(t.timestamp)
-                m['balance'].append(t.balance_post)
-
-            self._df_balance = pd.DataFrame.from_dict(m) \
-                .set_index('timestamp')
+        # only rebuild when txns added since last call
+        if self._df_balance is None or not len(self._df_balance) == len(self.ledger):
+            m = self.ledger.cols()
+            self._df_balance = pd.DataFrame(
+                data=dict(balance=m['balance_post']),
+                index=pd.DatetimeIndex(m['timestamp'], name='timestamp'))
         
         return self._df_balance
 
@@ -134,32 +128,111 @@ class Account():
         self.df_balance.plot(kind='line', y='balance', logy=logy, linewidth=1, title=title, figsize=(12, 4))
 
     def print_txns(self):
-        data = []
-        cols = ['Date', 'AcctBalance', 'Amount', 'PercentChange']
-        for t in self.txns:
-            data.append([
-                '{:%Y-%m-%d %H}'.format(t.timestamp),
-                '{:.{prec}f}'.format(t.balance_pre, prec=3),
-                '{:.{prec}f}'.format(t.amount, prec=2),
-                f.percent(t.percentchange)
-            ])
+        m = self.ledger.cols()
+        df = pd.DataFrame(dict(
+            Date=pd.DatetimeIndex(m['timestamp']).strftime('%Y-%m-%d %H'),
+            AcctBalance=[f'{x:.3f}' for x in m['balance_pre']],
+            Amount=[f'{x:.2f}' for x in m['amount']],
+            PercentChange=[f.percent(x) for x in m['percentchange']]))
         
-        pd.options.display.max_rows = len(data)
-        df = pd.DataFrame(data=data, columns=cols)
+        pd.options.display.max_rows = len(df)
         display(df)
         pd.options.display.max_rows = 100
 
     def get_df(self):
-        df = pd.DataFrame(columns=['Timestamp', 'Balance', 'PercentChange'])
-        for i, t in enumerate(self.txns):
-            df.loc[i] = [t.timestamp, t.balance_pre, t.percentchange]
-        return df
+        m = self.ledger.cols()
+        return pd.DataFrame(dict(
+            Timestamp=m['timestamp'],
+            Balance=m['balance_pre'],
+            PercentChange=m['percentchange']))
+
+class CandleCursor():
+    """Lightweight candle backed by df column arrays, accessed by positional index
+    - replaces df.itertuples() namedtuples in decide_full, exposes same attrs eg c.High, c.pxhigh, c.Index
+    - all cursors share the same dict of column arrays, only the position is stored per candle
+    """
+    __slots__ = ('cols', 'i')
+
+    def __init__(self, cols : dict, i : int=0):
+        self.cols = cols
+        self.i = i
+
+    @classmethod
+    def from_df(cls, df):
+        """Convert df columns to numpy arrays once, keep index as pd.Timestamp for c.Index"""
+        cols = {col: df[col].to_numpy() for col in df.columns}
+        cols['Index'] = np.asarray(df.index.to_list(), dtype=object)
+        return cls(cols=cols)
+
+    def __getattr__(self, name):
+        # slots not set yet (eg during unpickling) must not recurse
+        if name in self.__slots__ or name.startswith('__'):
+            raise AttributeError(name)
+
+        try:
+            return self.cols[name][self.i]
+        except KeyError:
+            raise AttributeError(f'Candle has no column: {name}')
+
+    def __getitem__(self, name):
+        return self.__getattr__(name)
+
+    def __len__(self):
+        return len(self.cols['Index'])
+
+    def at(self, i : int):
+        """Return new cursor at position i, sharing column arrays"""
+        return CandleCursor(cols=self.cols, i=i)
+
+    def _asdict(self) -> dict:
+        return {name: arr[self.i] for name, arr in self.cols.items()}
+
+    def next_cross(self, i_start : int, i_end : int, above=None, below=None, chunk : int=32) -> int:
+        """Return first position in [i_start, i_end) where High >= above or Low <= below, else i_end
+        - above/below can be scalar price, or array aligned to cols if price changes every candle
+        - scans in doubling chunks, so nearby events stay cheap and far ones dont loop in python
+
+        Parameters
+        ----------
+        i_start : int
+        i_end : int
+        above : float | np.ndarray, optional
+        below : float | np.ndarray, optional
+        chunk : int, optional
+            size of first chunk to check, default 32
+
+        Returns
+        -------
+        int
+        """
+        high, low = self.cols['High'], self.cols['Low']
+        i = i_start
+
+        while i < i_end:
+            j = min(i + chunk, i_end)
+            hit = np.zeros(j - i, dtype=bool)
+
+            if not above is None:
+                hit |= high[i:j] >= (above[i:j] if np.ndim(above) else above)
+
+            if not below is None:
+                hit |= low[i:j] <= (below[i:j] if np.ndim(below) else below)
+
+            if hit.any():
+                return i + int(hit.argmax())
+
+            i, chunk = j, chunk * 2
+
+        return i_end
 
 class Backtest():
-    def __init__(self, symbol, startdate=None, strats=[], daterange=365, df=None, row=None, account=None, partial=False, u=None, **kw):
+    def __init__(self, symbol, startdate=None, strats=[], daterange=365, df=None, row=None, account=None, partial=False, u=None, profile=False, **kw):
 
         if not isinstance(strats, list): strats = [strats]
 
+        # opt-in per stage timing/memory, see profile_report()
+        self.profiler = f.Profiler() if profile else None
+
         if row is None:
             dfsym = pd.read_csv(Path(f.topfolder) / 'data/symbols.csv')
             dfsym = dfsym[dfsym['symbol']==symbol]
@@ -184,47 +257,232 @@ class Backtest():
                 self.account = Account()
 
             self.i = 1
-            self.candles = []
-            df = df[df.index >= self.startdate]
             
             if df is None:
                 self.df = db.get_dataframe(symbol=symbol, startdate=startdate, daterange=daterange)
             else:
-                self.df = df
+                # positional slice, boolean mask would copy whole df (eg memmapped SharedCandles.get_df)
+                self.df = df.iloc[df.index.searchsorted(self.startdate):]
 
             if partial:
                 if u is None: u = live.User()
-                self.df = u.append_partial(df)
+                self.df = u.append_partial(self.df)
            
             self.startrow = self.df.index.get_loc(startdate)
 
-            for strat in self.strats:
-                strat.init(sym=self)
+            with self.profile_stage('strat_init'):
+                for strat in self.strats:
+                    strat.init(sym=self)
+
+    @contextmanager
+    def profile_stage(self, name):
+        """Record stage on backtest's profiler (and any nested stages), do nothing if not profiling"""
+        prof = getattr(self, 'profiler', None)
+        if prof is None:
+            yield
+            return
+
+        with prof.activate(), prof.stage(name):
+            yield
+
+    @contextmanager
+    def profile_hooks(self):
+        """Record per-call stages for strategy/trade methods called every candle"""
+        prof = getattr(self, 'profiler', None)
+        if prof is None:
+            yield
+            return
+
+        with prof.patch(Strategy, 'decide'), \
+            prof.patch(Strategy, 'next_event'), \
+            prof.patch(Trade, 'check_orders'):
+            yield
+
+    def profile_report(self) -> pd.DataFrame:
+        """Return df of calls, total secs, us/call, pct of slowest stage and peak memory per stage
+
+        Returns
+        -------
+        pd.DataFrame
+            None if backtest not init with profile=True
+        """
+        prof = getattr(self, 'profiler', None)
+        return prof.report() if not prof is None else None
 
     def init_candle(self, c):
         self.cdl = c
-        self.candles.append(c)
 
-    def decide_full(self):
-        df = self.df
-        idx = df.index
-        print(f'Test range: {idx[0]} - {idx[-1]}')
-        length = len(df)
+    def __getstate__(self):
+        # df.itertuples() row namedtuple can't be pickled
+        m = self.__dict__.copy()
+        if hasattr(self.row, '_asdict'):
+            m['row'] = SimpleNamespace(**self.row._asdict())
 
-        for c in df.itertuples():
-            self.init_candle(c=c)
-            
-            self.i = df.index.get_loc(c.Index)
-            i = self.i
-            if not i < self.startrow:
-                if i == length: return
+        return m
+
+    def decide_full(self, i_start=0, cursor=None):
+        """Loop all candles from i_start and let each strat decide
+
+        Parameters
+        ----------
+        i_start : int, optional
+            first candle to process, eg resuming from checkpoint, default 0
+        cursor : CandleCursor, optional
+            cursor already built from self.df, default None
+        """
+        with self.profile_stage('decide_full'), self.profile_hooks():
+            df = self.df
+            idx = df.index
+            print(f'Test range: {idx[i_start]} - {idx[-1]}')
+            if cursor is None:
+                cursor = CandleCursor.from_df(df)
+
+            self.cursor = cursor
+            n = len(cursor)
+            i = i_start
+
+            while i < n:
+                c = cursor.at(i)
+                self.init_candle(c=c)
+                self.i = i
+
+                if i < self.startrow:
+                    i += 1
+                    continue
 
                 for strat in self.strats:
                     strat.decide(c)
-        
+
+                # jump straight to next candle where any strat could act, quiet candles in between only advance state
+                i_next = min(strat.next_event(i=i, i_end=n) for strat in self.strats)
+
+                if i_next > i + 1:
+                    for strat in self.strats:
+                        strat.skip(i=i, i_next=i_next)
+
+                    self.init_candle(c=cursor.at(i_next - 1))
+                    self.i = i_next - 1
+
+                i = i_next
+
+        # partial candle will change, so last complete candle is where a checkpoint resumes from
+        self.ts_last = idx[-2] if self.partial else idx[-1]
+
         if self.partial:
             self.strats[0].trades[-1].partial = True
 
+    def resume(self, df, partial=False, u=None):
+        """Continue backtest loaded from checkpoint, only process candles after last checkpointed candle
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            candles including checkpoint's last candle, eg same 15 day live window
+        partial : bool, optional
+            append partial candle, default False
+        u : live.User, optional
+        """
+        if partial:
+            if u is None: u = live.User()
+            df = u.append_partial(df)
+
+        # streamed signals only update new candles, instead of strat.init recomputing full window
+        stream = getattr(self, 'stream', None)
+        if not stream is None:
+            df = stream.transform(df=df, df_prev=self.df, partial=partial)
+
+        self.df = df
+        self.partial = partial
+        self.startrow = 0
+
+        # signals need to be recalculated for new candles, conf signals re-registered by init
+        with self.profile_stage('strat_init'):
+            for strat in self.strats:
+                strat.conf = Confidence()
+                if not stream is None and hasattr(strat, 'presignaled'):
+                    strat.presignaled = True
+
+                strat.init(sym=self)
+
+        # open trades store candle positions in previous window, window slides forward so rebase to new df
+        cursor = CandleCursor.from_df(self.df)
+        for strat in self.strats:
+            for t in strat.trades:
+                if t.active and not t.i_first is None:
+                    t.rebase(cursor=cursor)
+
+        self.decide_full(i_start=self.df.index.searchsorted(self.ts_last, side='right'), cursor=cursor)
+
+    def save_checkpoint(self, p, n_trades=10):
+        """Save full backtest state (strats, trades, account) to resume next time with new candles only
+        - only last n_trades are saved so checkpoint size stays constant, strat.trade_offset counts the rest
+            so tradecount/tradenum continue on resume, self isn't modified
+
+        Parameters
+        ----------
+        p : Path
+        n_trades : int, optional
+            number of most recent trades to keep, default 10
+        """
+        if self.partial:
+            raise ValueError('Cant save checkpoint with partial candle!')
+
+        p = Path(p)
+        p.parent.mkdir(parents=True, exist_ok=True)
+
+        # swap in truncated trades for dump only
+        m = {strat: (strat.trades, strat.trade_offset) for strat in self.strats}
+        try:
+            for strat in self.strats:
+                n_drop = max(len(strat.trades) - n_trades, 0)
+                strat.trades, strat.trade_offset = strat.trades[n_drop:], strat.trade_offset + n_drop
+
+            # cloudpickle to handle lambda signal funcs
+            with open(p, 'wb') as file:
+                cloudpickle.dump(self, file)
+        finally:
+            for strat, (trades, trade_offset) in m.items():
+                strat.trades, strat.trade_offset = trades, trade_offset
+
+    @classmethod
+    def load_checkpoint(cls, p, df=None):
+        """Load backtest from checkpoint, return None if doesn't exist or df doesn't overlap checkpoint's last candle
+
+        Parameters
+        ----------
+        p : Path
+        df : pd.DataFrame, optional
+            new candles to check against, default None
+        """
+        p = Path(p)
+        if not p.exists():
+            return
+
+        with open(p, 'rb') as file:
+            sym = cloudpickle.load(file)
+
+        if not df is None and not df.index[0] <= sym.ts_last <= df.index[-1]:
+            return
+
+        # open trade's first candle must still be in window to rebase trade onto new df
+        if not df is None and any(
+                t.active and not t.i_first is None and t.ts_first < df.index[0]
+                for strat in sym.strats for t in strat.trades):
+            return
+
+        return sym
+
+    def decide_vectorized(self):
+        """Run full backtest with each strategy's vectorized path instead of looping candles
+        - only strategies which implement decide_vectorized can be used (eg ml)
+        """
+        idx = self.df.index
+        print(f'Test range: {idx[0]} - {idx[-1]}')
+
+        with self.profile_stage('decide_vectorized'):
+            for strat in self.strats:
+                strat.decide_vectorized()
+
     def print_final(self):
         style = self.result().style.hide_index()
         style.format({'Min': '{:.3f}',
@@ -237,7 +495,9 @@ class Backtest():
         a = self.account
         strat = self.strats[0]
 
-        drawdown, drawdates = a.drawdown()
+        with self.profile_stage('result'):
+            drawdown, drawdates = a.drawdown()
+            goodtrades = '{}/{}/{}'.format(strat.good_trades(), strat.tradecount(), strat.unfilledtrades)
 
         data = {
             'symbol': [self.symbol],
@@ -246,7 +506,7 @@ class Backtest():
             'Final': [a.balance],
             'Drawdown': [drawdown],
             'Period': [drawdates],
-            'Goodtrades': ['{}/{}/{}'.format(strat.good_trades(), strat.tradecount(), strat.unfilledtrades)]}
+            'Goodtrades': [goodtrades]}
 
         return pd.DataFrame(data=data)
 
@@ -286,13 +546,18 @@ class Confidence():
 
         return conf
 
-    def add_signal(self, df, signals=None, trendsignals=None):
+    def add_signal(self, df=None, signals=None, trendsignals=None):
         self.signals.extend(signals or [])
         self.trendsignals.extend(trendsignals or [])
 
+        # only register signals if df is None (signal cols already precomputed)
+        if df is None:
+            return
+
         # loop and add invoke all signals' add_signal method (add them to df)
-        for signal in signals + trendsignals:
-            df = df.pipe(signal.add_signal)
+        for signal in (signals or []) + (trendsignals or []):
+            with f.profile_stage(f'signals.{signal.__class__.__name__}'):
+                df = df.pipe(signal.add_signal)
 
         return df
     
@@ -371,6 +636,9 @@ class Position():
             name=o['name'])
 
 class Strategy():
+    result_cols = ['N', 'Timestamp', 'Sts', 'Dur', 'Entry', 'Exit',  'Contracts', 'Conf', 'Pnl', 'PnlAcct', 'Bal'] #'Market',
+    trade_offset = 0 # trades before self.trades[0], dropped from checkpoint (see Backtest.save_checkpoint)
+
     def __init__(self, weight=1, lev=5, slippage=0.02, **kw):
         self.i = 1
         self.status = 0
@@ -388,17 +656,38 @@ class Strategy():
         self.sym = None
         self.cdl =  None
         self.conf = Confidence()
+
+    def next_event(self, i, i_end):
+        """Return position of next candle after i which needs decide(), default every candle
+        - override with vectorized checks to skip candles where nothing can happen
+
+        Parameters
+        ----------
+        i : int
+            position of candle just decided
+        i_end : int
+            position after last candle
+
+        Returns
+        -------
+        int
+        """
+        return i + 1
+
+    def skip(self, i, i_next):
+        """Apply state changes of quiet candles between i and i_next (exclusive) without calling decide()"""
+        pass
             
     def tradecount(self):
-        return len(self.trades)
+        return self.trade_offset + len(self.trades)
 
     def last_trade(self):
-        return self.trades[self.tradecount() - 1]
+        return self.trades[-1]
 
     def get_trade(self, i):
         numtrades = self.tradecount()
         if i > numtrades: i = numtrades
-        return self.trades[i - 1]
+        return self.trades[i - 1 - self.trade_offset]
 
     def good_trades(self):
         count = 0
@@ -456,32 +745,38 @@ class Strategy():
                     'Bal': '{:.2f}'})
         display(style)
 
+    def decide_vectorized(self):
+        raise NotImplementedError(f'{self.__class__.__module__} has no vectorized backtest!')
+
     def result(self, first=float('inf'), last=0):
         data = []
         trades = self.trades
-        cols = ['N', 'Timestamp', 'Sts', 'Dur', 'Entry', 'Exit',  'Contracts', 'Conf', 'Pnl', 'PnlAcct', 'Bal'] #'Market',
+        cols = self.result_cols
+        stage = self.sym.profile_stage('result_trades') if not self.sym is None else nullcontext()
 
-        for t in trades[last * -1: min(first, len(trades))]:
-            data.append([
-                t.tradenum,
-                t.candles[0].Index,
-                t.status,
-                t.duration(),
-                t.entryprice,
-                t.exitprice,
-                # t.exit_order().ordtype_str(),
-                t.filledcontracts,
-                t.conf,
-                t.pnlfinal,
-                t.pnl_acct(),
-                t.exitbalance])
+        with stage:
+            for t in trades[last * -1: min(first, len(trades))]:
+                data.append([
+                    t.tradenum,
+                    t.get_candle(1).Index,
+                    t.status,
+                    t.duration(),
+                    t.entryprice,
+                    t.exitprice,
+                    # t.exit_order().ordtype_str(),
+                    t.filledcontracts,
+                    t.conf,
+                    t.pnlfinal,
+                    t.pnl_acct(),
+                    t.exitbalance])
         
         return pd.DataFrame.from_records(data=data, columns=cols) \
             .assign(profitable=lambda x: x.Pnl > 0)
 
 class Trade():
     def __init__(self):
-        self.candles = []
+        self.i_first = None # position of first candle in backtest column arrays
+        self.n_candles = 0
         self.orders = []
         self.active = True
         self.filledcontracts = 0    
@@ -556,16 +851,72 @@ class Trade():
         self.close_order(price=closeprice, contracts=self.contracts * -1)
         self.deactivate_orders(closeall=True) # this is only Trade_Chop
 
+    @property
+    def candles(self) -> list:
+        """Materialize trade's candles from backtest column arrays, only needed for charting etc"""
+        return [self.get_candle(i) for i in range(1, self.n_candles + 1)]
+
+    def skip_candles(self, cdl, n):
+        """Add n quiet candles to trade at once, cdl is last skipped candle"""
+        self.n_candles += n
+        self.cdl = cdl
+
+    def next_event(self, i, i_end, orders=None):
+        """Return next candle position after i where any active order could fill or trade times out, else i_end
+        - orders with delayed activation pending need checking on next candle
+
+        Parameters
+        ----------
+        i : int
+        i_end : int
+        orders : list, optional
+            only check these orders (eg exclude orders with per-candle price), default all orders
+
+        Returns
+        -------
+        int
+        """
+        if orders is None: orders = self.orders
+        i_next = min(i_end, self.i_first + self.timeout - 1) if self.timeout < float('inf') else i_end
+        ts = self.cdl.Index
+
+        for o in orders:
+            if o.active and not o.filled:
+                if not o.delaytime is None and o.delaytime > ts:
+                    return i + 1
+
+                above, below = o.fill_bounds()
+                i_next = self.cdl.next_cross(i + 1, i_next, above=above, below=below)
+
+        return max(i_next, i + 1)
+
     def get_candle(self, i):
-        return self.candles[i - 1]
+        """Return i'th candle of trade (1 is entry candle)"""
+        return self.cdl.at(self.i_first + i - 1)
+
+    @property
+    def ts_first(self):
+        """Timestamp of trade's entry candle"""
+        return self.cdl.cols['Index'][self.i_first]
+
+    def rebase(self, cursor : CandleCursor):
+        """Move candle positions onto new cursor's cols (eg resumed window has dropped candles from front)"""
+        ts = pd.Index(cursor.cols['Index'])
+        shift = ts.get_loc(self.ts_first) - self.i_first
+        self.i_first += shift
+        self.cdl = cursor.at(self.cdl.i + shift)
 
     def add_candle(self, cdl):
-        self.candles.append(cdl)
+        # only store position of candles, not candles themselves
+        if self.i_first is None:
+            self.i_first = cdl.i
+
+        self.n_candles += 1
         self.cdl = cdl
     
     def duration(self):
         offset = -1 if self.partial else 0
-        return len(self.candles) + offset
+        return self.n_candles + offset
 
     def pnl_acct(self):
         if self.exitbalance == 0:
@@ -607,7 +958,7 @@ class Trade():
     def extremum(self, highlow, firstonly=False):
         
         # entry candle
-        c = self.candles[0]
+        c = self.get_candle(1)
         with f.Switch(self.status * highlow) as case:
             if case(1, -2):
                 if highlow == 1:
@@ -620,15 +971,15 @@ class Trade():
         if firstonly: return ext
 
         # middle candles
-        for i in range(1, self.duration() - 2):
-            c = self.candles[i]
+        i, j = self.i_first + 1, self.i_first + self.duration() - 2
+        if j > i:
             if highlow == 1:
-                if c.High > ext: ext = c.High
+                ext = max(ext, self.cdl.cols['High'][i:j].max())
             elif highlow == -1:
-                if c.Low < ext: ext = c.Low
+                ext = min(ext, self.cdl.cols['Low'][i:j].min())
 
         # exit candle
-        c = self.candles[self.duration() - 1]
+        c = self.get_candle(self.duration())
         with f.Switch(self.status * highlow) as case:
             if case(-1, 2):
                 fExt = self.exitprice
@@ -649,7 +1000,13 @@ class Trade():
         return list(filter(lambda x: 'close' in x.name, self.orders))[0]
 
     def df(self):
-        return self.sym.df.iloc[self.i_enter:self.i_exit]
+        """Return df of trade's candles from backtest column arrays"""
+        i, j = self.i_first, self.i_first + self.n_candles
+        cols = self.cdl.cols
+
+        return pd.DataFrame(
+            data={name: arr[i:j] for name, arr in cols.items() if not name == 'Index'},
+            index=pd.Index(cols['Index'][i:j], name='Timestamp'))
 
     def print_orders(self, orders=None):
         if orders is None:
@@ -822,6 +1179,10 @@ class Order():
         price = self.price if not self.isstop else self.stoppx()
         return price
                                 
+    def fill_bounds(self):
+        """Return (above, below) price which candle High/Low must reach for check() to fill order"""
+        return (self.price, None) if self.direction == 1 else (None, self.price)
+
     def check(self, c):
         checkprice = c.High if self.direction == 1 else c.Low
         
@@ -1102,16 +1463,37 @@ class OrdArray():
         for order in self.orders:
             order.print_self()
 
-class Txn():
-    def __init__(self):
-        self.amount = 0
-        self.timestamp = None
-        self.balance_pre = 0
-        self.balance_post = 0
-        self.percentchange = 0
+class Ledger():
+    """Columnar account transactions, preallocated numpy arrays which double in size when full"""
+    dtypes = dict(
+        timestamp='datetime64[ns]',
+        amount=float,
+        balance_pre=float,
+        balance_post=float,
+        percentchange=float)
 
-    def printTxn(self):
-        pass
+    def __init__(self, size=1024):
+        self.n = 0
+        self.arrays = {name: np.empty(size, dtype=dtype) for name, dtype in self.dtypes.items()}
+
+    def __len__(self):
+        return self.n
+
+    def append(self, timestamp, **kw):
+        n = self.n
+
+        if n == len(self.arrays['amount']):
+            self.arrays = {name: np.resize(arr, n * 2) for name, arr in self.arrays.items()}
+
+        self.arrays['timestamp'][n] = np.datetime64(timestamp, 'ns')
+        for name, val in kw.items():
+            self.arrays[name][n] = val
+
+        self.n += 1
+
+    def cols(self) -> dict:
+        """Return dict of array views of filled rows only"""
+        return {name: arr[:self.n] for name, arr in self.arrays.items()}
 
 class Candle():
     def __init__(self, row):
@@ -0,0 +1,383 @@
+"""Offline engine speed benchmarks on synthetic OHLCV, no candles loaded from database
+
+- time Backtest.decide_full per strategy and SignalManager signal construction
+- check ModelManager halving searches run with default kwargs
+- results appended to data/benchmark/results.csv, compared to per-case thresholds in data/benchmark/thresholds.csv
+
+Run eg:
+    python -m jambot.benchmark --sizes 1000 10000 --freqs 1h 5min
+    python -m jambot.benchmark --set-thresholds
+"""
+import argparse
+import subprocess
+from datetime import datetime as dt
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMRegressor
+from sklearn.compose import ColumnTransformer
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.preprocessing import MinMaxScaler
+
+from . import backtest as bt
+from . import functions as f
+from . import signals as sg
+from . import sklearn_helper_funcs as sf
+from .strategies import ml, sfp, trend, trendclose, trendrev
+
+try:
+    from IPython.display import display
+except ModuleNotFoundError:
+    display = print
+
+p_bench = f.topfolder / 'data/benchmark'
+
+default_sizes = (1_000, 10_000, 100_000, 1_000_000)
+default_freqs = ('1h', '5min')
+default_signals = ['EMA', 'Momentum', 'Trend', 'Candle', 'EMASlope', 'Volatility', 'Volume', 'MACD', 'SFP']
+
+def make_ohlcv(n : int, freq : str='1h', seed : int=0, startprice : float=10000, vty : float=0.01) -> pd.DataFrame:
+    """Return synthetic OHLCV df of n candles, random walk with volatility clustering
+
+    Parameters
+    ----------
+    n : int
+        number of candles
+    freq : str, optional
+        pandas freq of candles, default '1h'
+    seed : int, optional
+    startprice : float, optional
+    vty : float, optional
+        base pct stdev of close to close moves, default 0.01
+
+    Returns
+    -------
+    pd.DataFrame
+        cols Open, High, Low, Close, VolBTC, with Timestamp index
+    """
+    if n < 1:
+        raise ValueError(f'Need at least 1 candle, got n={n}')
+
+    rng = np.random.default_rng(seed)
+
+    # slowly varying volatility so trend/vty signals see regimes, not just white noise
+    # window can't be longer than n, else mode='same' returns window length
+    w = min(50, n)
+    regime = np.exp(np.convolve(rng.normal(0, 0.3, n), np.ones(w) / w, mode='same'))
+    ret = rng.normal(0, vty, n) * regime
+
+    close = startprice * np.exp(np.cumsum(ret))
+    _open = np.r_[startprice, close[:-1]]
+    wick = np.abs(rng.normal(0, vty / 2, (2, n))) * regime
+
+    idx = pd.date_range(dt(2018, 1, 1), periods=n, freq=freq, name='Timestamp')
+
+    return pd.DataFrame(
+        index=idx,
+        data=dict(
+            Open=_open,
+            High=np.maximum(_open, close) * (1 + wick[0]),
+            Low=np.minimum(_open, close) * (1 - wick[1]),
+            Close=close,
+            VolBTC=rng.lognormal(8, 1, n) * regime))
+
+def add_ml_cols(df, seed : int=0, n_smooth : int=10) -> pd.DataFrame:
+    """Add fake y_pred/rolling_proba cols needed by ml strategy"""
+    rng = np.random.default_rng(seed)
+    proba = pd.Series(rng.uniform(0, 1, len(df)), index=df.index).rolling(n_smooth, min_periods=1).mean()
+
+    return df.assign(
+        y_pred=np.where(proba > 0.5, 1, -1),
+        rolling_proba=proba)
+
+def make_strat(name : str):
+    """Return strategy init with default params used in launch.py"""
+    if name == 'trendrev':
+        strat = trendrev.Strategy(speed=(16, 6), norm=(0.004, 0.024))
+        strat.slippage = 0
+        strat.stoppercent = -0.03
+        strat.timeout = 40
+    elif name == 'trend':
+        strat = trend.Strategy(speed=(25, 18))
+    elif name == 'trendclose':
+        strat = trendclose.Strategy(speed=(25, 18))
+    elif name == 'sfp':
+        strat = sfp.Strategy()
+    elif name in ('ml', 'ml_vec'):
+        strat = ml.Strategy(lev=3, slippage=0)
+    else:
+        raise ValueError(f'Strategy not benchmarked: {name}')
+
+    return strat
+
+def time_backtest(name : str, df : pd.DataFrame, symbol : str='XBTUSD') -> float:
+    """Return seconds to run full backtest for strategy, not including signal setup in strat.init"""
+    if name in ('ml', 'ml_vec'):
+        df = add_ml_cols(df)
+
+    strat = make_strat(name)
+    sym = bt.Backtest(symbol=symbol, startdate=df.index[0], strats=strat, df=df, partial=False)
+
+    start = perf_counter()
+    sym.decide_vectorized() if name == 'ml_vec' else sym.decide_full()
+    return perf_counter() - start
+
+def time_signals(df : pd.DataFrame, signals : list=None) -> dict:
+    """Return dict of {signal group name: seconds} to add each signal group to df"""
+    sm = sg.SignalManager()
+    m = {}
+
+    for signal in signals or default_signals:
+        start = perf_counter()
+        df = sm.add_signals(df=df, signals=[signal])
+        m[signal if isinstance(signal, str) else signal.__class__.__name__] = perf_counter() - start
+
+    m['all'] = sum(m.values())
+    return m
+
+def check_parallel(df : pd.DataFrame, signals : list=None, n_jobs : int=4) -> tuple:
+    """Run all signal groups sequentially and with n_jobs workers, return (parallel secs, cols which differ)
+    - missing/extra/reordered cols and any value differences count as mismatch
+    """
+    signals = signals or default_signals
+    df_seq = sg.SignalManager(n_jobs=1).add_signals(df=df.copy(), signals=signals)
+
+    start = perf_counter()
+    df_par = sg.SignalManager(n_jobs=n_jobs).add_signals(df=df.copy(), signals=signals)
+    secs = perf_counter() - start
+
+    cols = list(dict.fromkeys(df_seq.columns.to_list() + df_par.columns.to_list()))
+    mismatch = [c for c in cols if not c in df_seq or not c in df_par or not df_seq[c].equals(df_par[c])]
+
+    if not mismatch and not df_seq.columns.equals(df_par.columns):
+        mismatch = ['col order']
+
+    return secs, mismatch
+
+def check_skip_quiet(df : pd.DataFrame, name : str='trendrev', symbol : str='XBTUSD') -> tuple:
+    """Run backtest with quiet candles skipped and candle by candle, return (skip_quiet secs, list of differences)
+    - strategy must have skip_quiet flag, eg trendrev
+    - trades (strat.result()) and every account ledger entry must be identical
+    """
+    m = {}
+    for skip in (False, True):
+        strat = make_strat(name)
+        strat.skip_quiet = skip
+        sym = bt.Backtest(symbol=symbol, startdate=df.index[0], strats=strat, df=df.copy(), partial=False)
+
+        start = perf_counter()
+        sym.decide_full()
+        m[skip] = (perf_counter() - start, strat.result(), sym.account.ledger.cols())
+
+    (_, res_loop, ledger_loop), (secs, res_skip, ledger_skip) = m[False], m[True]
+    mismatch = [] if res_loop.equals(res_skip) else ['trades']
+    mismatch += [f'ledger.{k}' for k, arr in ledger_loop.items() if not np.array_equal(arr, ledger_skip[k])]
+
+    return secs, mismatch
+
+def check_halving(df : pd.DataFrame, n_splits : int=5) -> tuple:
+    """Run ModelManager.search with both halving types and default kwargs, return (secs, list of failed search types)
+    - fake target of forward returns, fit on ct > pca > lgbm pipe with TimeSeriesSplit folds
+    - search must not raise and every candidate must score, nan score means fits failed in some fold
+    """
+    df = sg.SignalManager().add_signals(df=df, signals=['EMA', 'Momentum', 'Volatility', 'Volume', 'MACD']) \
+        .assign(target=lambda x: x.Close.pct_change(5).shift(-5)) \
+        .dropna()
+
+    cols = [c for c in df.select_dtypes('number').columns if not c in ('Open', 'High', 'Low', 'Close', 'target')]
+    ct = ColumnTransformer(transformers=[('numeric', MinMaxScaler(), cols)])
+
+    mm = sf.ModelManager(ct=ct, cv_args=dict(cv=TimeSeriesSplit(n_splits)))
+    mm.x_train, mm.y_train = df[cols], df[['target']]
+    mm.make_pipe(name='lgbm', model=LGBMRegressor(n_estimators=20, verbose=-1, random_state=0))
+
+    failed = []
+    start = perf_counter()
+    for search_type in ('halving_grid', 'halving_random'):
+        try:
+            grid = mm.search(name='lgbm', params=dict(num_leaves=[4, 8, 16]), search_type=search_type)
+            if np.isnan(grid.cv_results_['mean_test_score']).any():
+                failed.append(search_type)
+        except Exception:
+            failed.append(search_type)
+
+    return perf_counter() - start, failed
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=f.topfolder, text=True).strip()
+    except Exception:
+        return ''
+
+def run(sizes=default_sizes, freqs=default_freqs, strats=('trendrev', 'trend', 'trendclose', 'sfp', 'ml', 'ml_vec'), signals=True, max_size_signals : int=1_000_000, search=True, max_size_search : int=10_000, seed : int=0) -> pd.DataFrame:
+    """Run all benchmark cases, one row per case
+
+    Parameters
+    ----------
+    sizes : iterable, optional
+        number of candles per case
+    freqs : iterable, optional
+        candle freqs, eg '1h', '5min'
+    strats : iterable, optional
+        strategy names to time decide_full
+    signals : bool, optional
+        time SignalManager signal groups, default True
+    max_size_signals : int, optional
+        skip signal timing above this many candles
+    search : bool, optional
+        check ModelManager halving searches with default kwargs, default True
+    max_size_search : int, optional
+        skip halving search check above this many candles
+    seed : int, optional
+
+    Returns
+    -------
+    pd.DataFrame
+        cols case, n, freq, secs, us_candle, error
+    """
+    data = []
+
+    def add_row(case, n, freq, secs=np.nan, error=''):
+        data.append(dict(case=case, n=n, freq=freq, secs=secs, us_candle=secs / n * 1e6, error=error))
+        print(f'{case:<20} {n:>9,} {freq:>6} {secs:8.3f}s {error}')
+
+    for freq in freqs:
+        for n in sizes:
+            df = make_ohlcv(n=n, freq=freq, seed=seed)
+
+            # strategies are independent, one stale strategy shouldn't stop the rest
+            for name in strats:
+                try:
+                    add_row(f'backtest_{name}', n, freq, secs=time_backtest(name=name, df=df.copy()))
+                except Exception as e:
+                    add_row(f'backtest_{name}', n, freq, error=f'{type(e).__name__}: {e}')
+
+            # skipping quiet candles must give same trades/balance as candle by candle loop
+            for name in [name for name in strats if hasattr(make_strat(name), 'skip_quiet')]:
+                try:
+                    secs, mismatch = check_skip_quiet(df=df, name=name)
+                    add_row(f'skip_quiet_{name}', n, freq, secs=secs, error=f'mismatch: {mismatch}' if mismatch else '')
+                except Exception as e:
+                    add_row(f'skip_quiet_{name}', n, freq, error=f'{type(e).__name__}: {e}')
+
+            if signals and n <= max_size_signals:
+                try:
+                    for name, secs in time_signals(df=df.copy()).items():
+                        add_row(f'signal_{name}', n, freq, secs=secs)
+                except Exception as e:
+                    add_row('signal_all', n, freq, error=f'{type(e).__name__}: {e}')
+
+                # parallel signal groups must give same frame as sequential
+                try:
+                    secs, mismatch = check_parallel(df=df)
+                    add_row('signal_parallel', n, freq, secs=secs, error=f'mismatch: {mismatch}' if mismatch else '')
+                except Exception as e:
+                    add_row('signal_parallel', n, freq, error=f'{type(e).__name__}: {e}')
+
+            # halving search must fit every cv fold with default min_resources
+            if search and n <= max_size_search:
+                try:
+                    secs, failed = check_halving(df=df.copy())
+                    add_row('search_halving', n, freq, secs=secs, error=f'failed: {failed}' if failed else '')
+                except Exception as e:
+                    add_row('search_halving', n, freq, error=f'{type(e).__name__}: {e}')
+
+    return pd.DataFrame(data) \
+        .assign(
+            timestamp=dt.now().replace(microsecond=0),
+            commit=git_commit())
+
+def save_results(df : pd.DataFrame, p=None):
+    """Append benchmark results to csv history"""
+    p = p or p_bench / 'results.csv'
+    p.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(p, mode='a', header=not p.exists(), index=False)
+
+def load_thresholds(p=None) -> pd.DataFrame:
+    p = p or p_bench / 'thresholds.csv'
+    if not p.exists():
+        return None
+
+    return pd.read_csv(p)
+
+def set_thresholds(df : pd.DataFrame, tolerance : float=0.25, p=None) -> pd.DataFrame:
+    """Save current results as baseline, case regresses if slower than baseline * (1 + tolerance)
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        results from run()
+    tolerance : float, optional
+        allowed pct slowdown before flagging regression, default 0.25
+
+    Returns
+    -------
+    pd.DataFrame
+        thresholds saved to csv
+    """
+    p = p or p_bench / 'thresholds.csv'
+    p.parent.mkdir(parents=True, exist_ok=True)
+
+    df_thresh = df[df.error == ''] \
+        [['case', 'n', 'freq', 'secs', 'commit']] \
+        .rename(columns=dict(secs='secs_base')) \
+        .assign(max_secs=lambda x: x.secs_base * (1 + tolerance))
+
+    # only replace thresholds for cases which were run
+    df_prev = load_thresholds(p)
+    if not df_prev is None:
+        keys = ['case', 'n', 'freq']
+        df_prev = df_prev.merge(df_thresh[keys], on=keys, how='left', indicator=True) \
+            .query('_merge == "left_only"') \
+            .drop(columns='_merge')
+        df_thresh = pd.concat([df_prev, df_thresh])
+
+    df_thresh.to_csv(p, index=False)
+    return df_thresh
+
+def compare(df : pd.DataFrame, df_thresh : pd.DataFrame=None) -> pd.DataFrame:
+    """Merge results with thresholds, add ratio to baseline and regressed flag
+    - errored cases (eg crash or parallel mismatch) always count as regressed, secs is nan so can't compare
+    """
+    if df_thresh is None:
+        df_thresh = load_thresholds()
+
+    errored = lambda x: x.error.fillna('') != ''
+
+    if df_thresh is None:
+        return df.assign(secs_base=np.nan, ratio=np.nan, regressed=errored)
+
+    return df \
+        .merge(df_thresh[['case', 'n', 'freq', 'secs_base', 'max_secs']], on=['case', 'n', 'freq'], how='left') \
+        .assign(
+            ratio=lambda x: x.secs / x.secs_base,
+            regressed=lambda x: (x.secs > x.max_secs) | errored(x))
+
+def main():
+    parser = argparse.ArgumentParser(description='Jambot backtest engine benchmarks on synthetic OHLCV')
+    parser.add_argument('--sizes', type=int, nargs='+', default=default_sizes)
+    parser.add_argument('--freqs', nargs='+', default=default_freqs)
+    parser.add_argument('--strats', nargs='+', default=['trendrev', 'trend', 'trendclose', 'sfp', 'ml', 'ml_vec'])
+    parser.add_argument('--no-signals', action='store_true')
+    parser.add_argument('--no-search', action='store_true')
+    parser.add_argument('--set-thresholds', action='store_true', help='save these results as new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    df = run(sizes=args.sizes, freqs=args.freqs, strats=args.strats, signals=not args.no_signals, search=not args.no_search)
+    save_results(df)
+
+    if args.set_thresholds:
+        set_thresholds(df, tolerance=args.tolerance)
+
+    df = compare(df)
+    display(df[['case', 'n', 'freq', 'secs', 'us_candle', 'secs_base', 'ratio', 'regressed', 'error']])
+
+    # non-zero exit so a regression can fail a script/CI step
+    if df.regressed.any():
+        print(f'Regressed: {df.regressed.sum()} case(s)')
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -99,7 +99,7 @@ class DB(object):
             df = pd.concat(lst) # maybe remove duplicates
             df.to_sql(name='Bitmex', con=self.conn, if_exists='append', index=False)
 
-    def get_dataframe(self, symbol=None, period=300, startdate=None, enddate=None, daterange=None, interval=1, offset=-15):
+    def get_dataframe(self, symbol=None, period=300, startdate=None, enddate=None, daterange=None, interval=1, offset=-15, panel=False):
         if startdate is None:
             startdate = f.timenow(interval=interval) + delta(hours=abs(period) * -1)
         else:
@@ -118,10 +118,13 @@ class DB(object):
         if not symbol is None: q = q.where(tbl.Symbol==symbol)
         if not enddate is None: q = q.where(tbl.Timestamp<=enddate)
         
-        df = pd.read_sql_query(sql=q.get_sql(), con=self.conn, parse_dates=['Timestamp']) \
-            .set_index('Timestamp', drop=False)
+        df = pd.read_sql_query(sql=q.get_sql(), con=self.conn, parse_dates=['Timestamp'])
 
-        return df
+        # panel of all symbols for SignalManager, else Timestamp index
+        if panel:
+            return df.set_index(['Symbol', 'Timestamp'])
+
+        return df.set_index('Timestamp', drop=False)
 
 print('{}: loading db'.format(__name__))
 db = DB()
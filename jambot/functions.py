@@ -1,12 +1,17 @@
 # General Functions module - don't rely on any other modules from jambot
 import json
 import os
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
 from datetime import (datetime as dt, timedelta as delta)
+from functools import wraps
 from pathlib import Path
 from sys import platform
-from time import time
+from time import perf_counter, time
 import yaml
 
+import numpy as np
 import pandas as pd
 import pyodbc
 import pypika as pk
@@ -39,7 +44,13 @@ def set_self(m, prnt=False, exclude=()):
             setattr(obj, k, v)
 
 def filter_df(dfall, symbol):
-    return dfall[dfall.Symbol==symbol].reset_index(drop=True)
+    # shared memory candles (optimization.SharedCandles) attach to symbol slice without copying
+    if hasattr(dfall, 'get_df'):
+        return dfall.get_df(symbol=symbol)
+
+    # same shape as db.get_dataframe, Timestamp index + col
+    df = dfall[dfall.Symbol==symbol]
+    return df if df.index.name == 'Timestamp' else df.set_index('Timestamp', drop=False)
 
 # DATETIME
 def check_date(d):
@@ -91,8 +102,7 @@ def read_csv(startdate, daterange, symbol=None):
         df = filter_df(dfall=df, symbol=symbol)
 
     mask = ((df['Timestamp'] >= startvalue(startdate)) & (df['Timestamp'] <= enddate(startdate, daterange)))
-    df = df.loc[mask].reset_index(drop=True)
-    return df
+    return df.loc[mask].set_index('Timestamp', drop=False)
 
 def percent(val):
     return '{:.2%}'.format(val)
@@ -236,3 +246,163 @@ class Switch:
 
     def __call__(self, *values):
         return self.value in values
+
+class Profiler():
+    """Opt-in wall time, call count and peak memory per named stage
+    - stages can nest, eg signals inside strat_init, per-call stages (decide) skip memory tracking as tracemalloc is slow
+    - Profiler.get_current() is the active profiler in calling thread, so deep code (eg SignalManager) can record stages without passing it down
+    - other threads (eg another backtest, SignalManager threading workers) never record into it, so stage stack stays consistent
+
+    Examples
+    --------
+    >>> prof = Profiler()
+    >>> with prof.activate(), prof.stage('decide_full'):
+    ...     run()
+    >>> prof.report()
+    """
+    _local = threading.local() # active profiler per thread
+    _patched = {} # {(cls, method): [original func, n profilers patching]}
+    _lock = threading.Lock()
+
+    def __init__(self, track_memory=True):
+        self.track_memory = track_memory
+        self.stats = {} # {stage: dict(calls, secs, peak_mb)}
+        self._frames = [] # stack of open memory stages
+        self._hooks = {} # {(cls, method): stage name} patched by this profiler
+
+    @classmethod
+    def get_current(cls):
+        """Return profiler active in calling thread, or None"""
+        return getattr(cls._local, 'profiler', None)
+
+    @contextmanager
+    def activate(self):
+        """Set as active profiler in calling thread, start tracemalloc if needed"""
+        prev, started = Profiler.get_current(), False
+        Profiler._local.profiler = self
+
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started = True
+
+        try:
+            yield self
+        finally:
+            Profiler._local.profiler = prev
+            if started:
+                tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name, memory=True):
+        memory = memory and self.track_memory and tracemalloc.is_tracing()
+
+        if memory:
+            # reset peak so this stage's peak is measured, parent keeps max of its own + children's peaks
+            cur, peak = tracemalloc.get_traced_memory()
+            if self._frames:
+                self._frames[-1]['peak'] = max(self._frames[-1]['peak'], peak)
+
+            tracemalloc.reset_peak()
+            frame = dict(start=cur, peak=cur)
+            self._frames.append(frame)
+
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            secs = perf_counter() - start
+            m = self.stats.setdefault(name, dict(calls=0, secs=0., peak_mb=np.nan))
+            m['calls'] += 1
+            m['secs'] += secs
+
+            if memory:
+                self._frames.pop()
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                m['peak_mb'] = np.nanmax([m['peak_mb'], (peak - frame['start']) / 1e6])
+
+                if self._frames:
+                    self._frames[-1]['peak'] = max(self._frames[-1]['peak'], peak)
+
+    def wrap(self, name, func, memory=False):
+        """Return func which records a stage every call"""
+        @wraps(func)
+        def _wrapper(*args, **kw):
+            with self.stage(name, memory=memory):
+                return func(*args, **kw)
+
+        return _wrapper
+
+    @staticmethod
+    def _hook(key, func):
+        """Return func which records a stage on calling thread's active profiler, only if that profiler patched key"""
+        @wraps(func)
+        def _wrapper(*args, **kw):
+            prof = Profiler.get_current()
+            name = prof._hooks.get(key) if not prof is None else None
+            if name is None:
+                return func(*args, **kw)
+
+            with prof.stage(name, memory=False):
+                return func(*args, **kw)
+
+        return _wrapper
+
+    @contextmanager
+    def patch(self, cls, method, name=None):
+        """Temporarily wrap method on cls and all its subclasses which override it, eg Trade.check_orders
+        - class methods are shared by all threads, so one hook per method is installed while any profiler patches it,
+        and only records calls made in threads where a patching profiler is active
+        """
+        name = name or method
+        classes, keys = [cls], []
+
+        with Profiler._lock:
+            while classes:
+                _cls = classes.pop()
+                classes.extend(_cls.__subclasses__())
+
+                if method in _cls.__dict__:
+                    key = (_cls, method)
+                    if not key in Profiler._patched:
+                        func = _cls.__dict__[method]
+                        Profiler._patched[key] = [func, 0]
+                        setattr(_cls, method, self._hook(key, func))
+
+                    Profiler._patched[key][1] += 1
+                    self._hooks[key] = name
+                    keys.append(key)
+
+        try:
+            yield
+        finally:
+            with Profiler._lock:
+                for key in keys:
+                    self._hooks.pop(key, None)
+                    m = Profiler._patched[key]
+                    m[1] -= 1
+
+                    # last profiler out restores original
+                    if m[1] == 0:
+                        setattr(key[0], method, m[0])
+                        del Profiler._patched[key]
+
+    def report(self) -> pd.DataFrame:
+        """Return df of stages sorted by total time"""
+        df = pd.DataFrame.from_dict(self.stats, orient='index')
+        if df.empty:
+            return df
+
+        total = df.secs.max()
+
+        return df \
+            .rename_axis('stage') \
+            .assign(
+                us_call=lambda x: x.secs / x.calls * 1e6,
+                pct=lambda x: x.secs / total) \
+            .sort_values('secs', ascending=False) \
+            [['calls', 'secs', 'us_call', 'pct', 'peak_mb']]
+
+def profile_stage(name, memory=True):
+    """Record stage on active Profiler, or do nothing if not profiling"""
+    prof = Profiler.get_current()
+    return prof.stage(name, memory=memory) if not prof is None else nullcontext()
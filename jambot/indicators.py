@@ -0,0 +1,508 @@
+"""NumPy versions of the ta indicators used by signals.py
+- SignalGroup.make_signal dispatches cls/ta_func signals here (see kernels), ta classes are only used as keys
+- each kernel computes only the one output a signal uses, from ndarrays, no intermediate pd.Series/DataFrame objs
+- recursive smoothing (ewm) still uses pandas' cython loop so values match ta, rolling.apply lambdas and python loops in ta are vectorized
+- same args/defaults as ta __init__, same fillna behaviour as ta IndicatorMixin._check_fillna
+- validate() compares every kernel with its ta indicator
+- inside segmented(), primitives (shift, ema, rolling_*, check_fillna) restart at each segment start,
+    so kernels built only from them compute a stacked multi symbol panel in one pass (see panel_kernels)
+"""
+from contextlib import contextmanager
+from functools import lru_cache
+import inspect
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:
+    # numpy < 1.20 (requirements.txt pins 1.19.4)
+    from numpy.lib.stride_tricks import as_strided
+
+    def sliding_window_view(x : np.ndarray, window_shape : int) -> np.ndarray:
+        """Read only (len(x) - window_shape + 1, window_shape) view of 1d x"""
+        x = np.asarray(x)
+        return as_strided(x, shape=(len(x) - window_shape + 1, window_shape), strides=x.strides * 2, writeable=False)
+
+# max rows of (n, window) strided view materialized at once
+_chunk = 2 ** 16
+
+# active Segments while computing stacked panel, see segmented()
+_segments = None
+
+class Segments():
+    """Contiguous blocks of rows (eg one per symbol) in stacked arrays"""
+    def __init__(self, starts : np.ndarray, n : int):
+        self.starts = np.asarray(starts, dtype=int)
+        self.ids = np.repeat(np.arange(len(self.starts)), np.diff(np.r_[self.starts, n])) # segment of each row
+        self.first = self.starts[self.ids] # position of first row of each row's segment
+        self.pos = np.arange(n) - self.first # position of row within its segment
+        self.bounds = list(zip(self.starts, np.r_[self.starts[1:], n]))
+
+def per_segment(func, x : np.ndarray) -> np.ndarray:
+    """Apply func to whole x, or to each segment's slice if segmented (for pandas cython loops, no groupby overhead)"""
+    if _segments is None:
+        return func(x)
+
+    return np.concatenate([func(x[i:j]) for i, j in _segments.bounds])
+
+@contextmanager
+def segmented(starts : np.ndarray, n : int):
+    """Restart shift/ema/rolling_*/check_fillna at each segment start while active
+
+    Parameters
+    ----------
+    starts : np.ndarray
+        position of first row of each segment, eg each symbol in (Symbol, Timestamp) panel
+    n : int
+        total rows
+    """
+    global _segments
+    prev, _segments = _segments, Segments(starts=starts, n=n)
+    try:
+        yield _segments
+    finally:
+        _segments = prev
+
+def check_fillna(x : np.ndarray, value : float=0, fillna : bool=True) -> np.ndarray:
+    """Replace inf with nan, forward fill, then fill remaining nans with value (ta IndicatorMixin._check_fillna)"""
+    if not fillna:
+        return x
+
+    x = np.where(np.isinf(x), np.nan, x)
+    valid = ~np.isnan(x)
+    idx = np.maximum.accumulate(np.where(valid, np.arange(len(x)), -1))
+
+    # nans before first valid value (in each segment, ffill doesn't cross segment starts)
+    first = _segments.first if not _segments is None else 0
+    is_filled = idx >= first
+
+    x = np.where(is_filled, x[np.maximum(idx, 0)], value)
+    return x
+
+def shift(x : np.ndarray, n : int=1, fill_value : float=np.nan) -> np.ndarray:
+    out = np.empty_like(x, dtype=float)
+    if n >= len(x):
+        out[:] = fill_value
+        return out
+
+    out[:n] = fill_value
+    out[n:] = x[:len(x) - n]
+
+    if not _segments is None:
+        out[_segments.pos < n] = fill_value
+
+    return out
+
+def ema(x : np.ndarray, span : int=None, alpha : float=None, fillna : bool=False, min_periods : int=None) -> np.ndarray:
+    """ewm(adjust=False) mean, min_periods 0 if fillna else span (ta utils._ema)"""
+    if min_periods is None:
+        min_periods = 0 if fillna else span
+
+    return per_segment(
+        lambda x: pd.Series(x).ewm(span=span, alpha=alpha, min_periods=min_periods, adjust=False).mean().to_numpy(), x)
+
+def rolling_sum(x : np.ndarray, window : int, min_periods : int=None) -> np.ndarray:
+    """pandas rolling sum, one cython pass"""
+    return per_segment(lambda x: pd.Series(x).rolling(window, min_periods=min_periods).sum().to_numpy(), x)
+
+def rolling_mean(x : np.ndarray, window : int, min_periods : int=None) -> np.ndarray:
+    return per_segment(lambda x: pd.Series(x).rolling(window, min_periods=min_periods).mean().to_numpy(), x)
+
+def windows(x : np.ndarray, window : int, pad : float=np.nan):
+    """Yield (i_start, (rows, window) view) in chunks, first window - 1 rows padded at start so output aligns with x"""
+    x = np.concatenate([np.full(window - 1, pad), x])
+
+    for i in range(0, len(x) - window + 1, _chunk):
+        yield i, sliding_window_view(x[i:i + _chunk + window - 1], window)
+
+def segment_heads(x : np.ndarray, window : int, pad : float=np.nan) -> tuple:
+    """Return (rows, (len(rows), window) windows) for rows whose window starts before their segment, padded like windows()"""
+    seg = _segments
+    rows = np.flatnonzero(seg.pos < window - 1)
+    idx = rows[:, None] - (window - 1) + np.arange(window)
+    arr = np.where(idx >= seg.first[rows][:, None], x[np.maximum(idx, 0)], pad)
+    return rows, arr
+
+def rolling_reduce(x : np.ndarray, window : int, func, pad : float=np.nan, min_periods : int=None) -> np.ndarray:
+    """Apply func(arr, axis=1) to each rolling window, eg np.max, nan where fewer than min_periods rows"""
+    out = np.empty(len(x))
+    for i, arr in windows(x, window, pad=pad):
+        out[i:i + len(arr)] = func(arr, axis=1)
+
+    mp = (window if min_periods is None else max(min_periods, 1)) - 1
+
+    if _segments is None:
+        out[:mp] = np.nan
+        return out
+
+    # windows crossing into previous segment
+    rows, arr = segment_heads(x, window, pad=pad)
+    out[rows] = func(arr, axis=1)
+    out[_segments.pos < mp] = np.nan
+    return out
+
+def rolling_max(x, window, min_periods=None):
+    return rolling_reduce(x, window, np.max, pad=-np.inf, min_periods=min_periods)
+
+def rolling_min(x, window, min_periods=None):
+    return rolling_reduce(x, window, np.min, pad=np.inf, min_periods=min_periods)
+
+def rolling_extrema(high : np.ndarray, low : np.ndarray, windows : list, offset : int=0) -> dict:
+    """Rolling High max and Low min for any set of windows, shifted by offset
+
+    - sparse table: level k holds extrema of blocks of 2**k candles, built once up to largest window (log2(w) passes)
+    - each window is then max/min of two overlapping blocks, one vectorized pass per window instead of one rolling pass
+    - same as s.rolling(window).max().shift(offset), nan propagates like min_periods=window
+
+    Parameters
+    ----------
+    high, low : np.ndarray
+    windows : list
+        window lengths, eg sweep of speeds
+    offset : int, optional
+        shift results forward, default 0
+
+    Returns
+    -------
+    dict
+        {('High', window): array, ('Low', window): array}
+    """
+    windows = sorted(set(int(w) for w in windows))
+    m = {}
+    if not windows:
+        return m
+
+    for name, x, func in (('High', high, np.maximum), ('Low', low, np.minimum)):
+        x = np.asarray(x, dtype=float)
+        n = len(x)
+
+        # levels[k][i] = extrema of x[i:i + 2**k]
+        levels = [x]
+        while 2 ** len(levels) <= windows[-1]:
+            prev, half = levels[-1], 2 ** (len(levels) - 1)
+            levels.append(func(prev[:-half], prev[half:]))
+
+        for w in windows:
+            out = np.full(n, np.nan)
+            k = w.bit_length() - 1
+            block, size = levels[k], 2 ** k
+
+            if n >= w:
+                # window ending at i covers blocks starting at i - w + 1 and i - size + 1
+                out[w - 1:] = func(block[:n - w + 1], block[w - size:n - size + 1])
+
+            m[(name, w)] = shift(out, offset) if offset else out
+
+    return m
+
+def true_range(high, low, prev_close) -> np.ndarray:
+    """Max of high - low, abs(high - prev_close), abs(low - prev_close), ignoring nan (like DataFrame.max(axis=1))"""
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+# momentum
+def rsi(close, window : int=14, fillna : bool=False):
+    diff = close - shift(close)
+    up = np.where(diff > 0, diff, 0.)
+    down = np.where(diff < 0, -diff, 0.)
+
+    min_periods = 0 if fillna else window
+    emaup = ema(up, alpha=1 / window, min_periods=min_periods)
+    emadn = ema(down, alpha=1 / window, min_periods=min_periods)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = np.where(emadn == 0, 100, 100 - 100 / (1 + emaup / emadn))
+
+    return check_fillna(x, value=50, fillna=fillna)
+
+def tsi(close, window_slow : int=25, window_fast : int=13, fillna : bool=False):
+    diff = close - shift(close)
+    mp_r, mp_s = (0, 0) if fillna else (window_slow, window_fast)
+
+    def smooth(x):
+        return ema(ema(x, span=window_slow, min_periods=mp_r), span=window_fast, min_periods=mp_s)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = smooth(diff) / smooth(np.abs(diff)) * 100
+
+    return check_fillna(x, value=0, fillna=fillna)
+
+def ultimate_oscillator(high, low, close, window1 : int=7, window2 : int=14, window3 : int=28, weight1 : float=4.0, weight2 : float=2.0, weight3 : float=1.0, fillna : bool=False):
+    close_shift = shift(close)
+    tr = true_range(high, low, close_shift)
+    bp = close - np.minimum(low, close_shift) # nan propagates, like min(skipna=False)
+
+    def avg(window):
+        mp = 0 if fillna else window
+        return rolling_sum(bp, window, mp) / rolling_sum(tr, window, mp)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = 100.0 * (weight1 * avg(window1) + weight2 * avg(window2) + weight3 * avg(window3)) / (weight1 + weight2 + weight3)
+
+    return check_fillna(x, value=50, fillna=fillna)
+
+def stoch(high, low, close, window : int=14, smooth_window : int=3, fillna : bool=False):
+    mp = 0 if fillna else window
+    smin = rolling_min(low, window, min_periods=mp)
+    smax = rolling_max(high, window, min_periods=mp)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = 100 * (close - smin) / (smax - smin)
+
+    return check_fillna(x, value=50, fillna=fillna)
+
+def roc(close, window : int=12, fillna : bool=False):
+    prev = shift(close, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = (close - prev) / prev * 100
+
+    return check_fillna(x, value=0, fillna=fillna)
+
+def awesome_oscillator(high, low, window1 : int=5, window2 : int=34, fillna : bool=False):
+    median = 0.5 * (high + low)
+    x = rolling_mean(median, window1, 0 if fillna else window1) \
+        - rolling_mean(median, window2, 0 if fillna else window2)
+
+    return check_fillna(x, value=0, fillna=fillna)
+
+def pvo(volume, window_slow : int=26, window_fast : int=12, window_sign : int=9, fillna : bool=False):
+    emaslow = ema(volume, span=window_slow, fillna=fillna)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = (ema(volume, span=window_fast, fillna=fillna) - emaslow) / emaslow * 100
+
+    return check_fillna(x, value=0, fillna=fillna)
+
+# volume
+def chaikin_money_flow(high, low, close, volume, window : int=20, fillna : bool=False):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mfv = ((close - low) - (high - close)) / (high - low)
+
+    mfv = np.where(np.isnan(mfv), 0., mfv) * volume
+
+    mp = 0 if fillna else window
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = rolling_sum(mfv, window, mp) / rolling_sum(volume, window, mp)
+
+    return check_fillna(x, value=0, fillna=fillna)
+
+def money_flow_index(high, low, close, volume, window : int=14, fillna : bool=False):
+    tp = (high + low + close) / 3.0
+    tp_prev = shift(tp)
+    mfr = tp * volume * np.where(tp > tp_prev, 1, np.where(tp < tp_prev, -1, 0))
+
+    # ta sums each window with np.sum, not a running sum
+    mp = 0 if fillna else window
+    pos = rolling_reduce(np.where(mfr >= 0, mfr, 0.), window, np.sum, pad=0., min_periods=mp)
+    neg = np.abs(rolling_reduce(np.where(mfr < 0, mfr, 0.), window, np.sum, pad=0., min_periods=mp))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = 100 - 100 / (1 + pos / neg)
+
+    return check_fillna(x, value=50, fillna=fillna)
+
+# volatility
+def ulcer_index(close, window : int=14, fillna : bool=False):
+    ui_max = rolling_max(close, window, min_periods=1)
+    r_i = 100 * (close - ui_max) / ui_max
+
+    x = np.sqrt(rolling_reduce(r_i ** 2 / window, window, np.sum))
+    return check_fillna(x, value=0, fillna=fillna)
+
+# trend
+def ema_indicator(close, window : int=14, fillna : bool=False):
+    return ema(close, span=window, fillna=fillna)
+
+def adx(high, low, close, window : int=14, fillna : bool=False):
+    """Same (quirky) wilder smoothing as ta ADXIndicator.adx, python loops replaced by equivalent ewm
+    - ta's smoothing is y[i] = y[i-1] - y[i-1] / w + x[i], which is ewm(alpha=1/w) of x * w
+    - last smoothed value is left at 0 by ta loop bounds, kept the same here
+    """
+    n, w = len(close), window
+    if n <= 2 * w:
+        return check_fillna(np.full(n, np.nan), value=20, fillna=fillna)
+
+    close_shift = shift(close)
+    dm = np.maximum(high, close_shift) - np.minimum(low, close_shift)
+
+    diff_up = high - shift(high)
+    diff_down = shift(low) - low
+    with np.errstate(invalid='ignore'):
+        pos = np.abs(((diff_up > diff_down) & (diff_up > 0)) * diff_up)
+        neg = np.abs(((diff_down > diff_up) & (diff_down > 0)) * diff_down)
+
+    def smooth(x):
+        # first value is sum of first w non-nan values (index 0 is nan), then y[i] uses x[w + i]
+        out = np.zeros(n - (w - 1))
+        out[:-1] = ema(np.r_[x[1:w + 1].sum(), x[w + 1:n] * w], alpha=1 / w, min_periods=0)
+        return out
+
+    trs, dip, din = smooth(dm), smooth(pos), smooth(neg)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dip, din = 100 * (dip / trs), 100 * (din / trs)
+        di = 100 * np.abs((dip - din) / (dip + din))
+
+    out = np.zeros(len(trs))
+    out[w:] = ema(np.r_[di[0:w].mean(), di[w:-1]], alpha=1 / w, min_periods=0)
+
+    # ta recursion propagates nan forever, ewm skips it
+    is_nan = np.isnan(np.r_[di[0:w].mean(), di[w:-1]])
+    if is_nan.any():
+        out[w + is_nan.argmax():] = np.nan
+
+    x = np.r_[np.zeros(w - 1), out]
+    return check_fillna(x, value=20, fillna=fillna)
+
+def aroon_indicator(close, window : int=25, fillna : bool=False):
+    """aroon up - aroon down, position of max/min in window, partial windows at start if fillna"""
+    n_pad = np.maximum(window - 1 - np.arange(len(close)), 0)
+    up, down = np.empty(len(close)), np.empty(len(close))
+
+    for i, arr in windows(close, window, pad=-np.inf):
+        up[i:i + len(arr)] = arr.argmax(axis=1)
+
+    for i, arr in windows(close, window, pad=np.inf):
+        down[i:i + len(arr)] = arr.argmin(axis=1)
+
+    x = ((up - n_pad + 1) / window * 100) - ((down - n_pad + 1) / window * 100)
+    x[:(1 if fillna else window) - 1] = np.nan
+    return check_fillna(x, value=0, fillna=fillna)
+
+def cci(high, low, close, window : int=20, constant : float=0.015, fillna : bool=False):
+    tp = (high + low + close) / 3.0
+    mp = 0 if fillna else window
+    tp_mean = rolling_mean(tp, window, mp)
+
+    # mean absolute deviation of each window, ta uses rolling.apply
+    mad = np.empty(len(tp))
+    for i, arr in windows(tp, window):
+        mad[i:i + len(arr)] = np.abs(arr - arr.mean(axis=1, keepdims=True)).mean(axis=1)
+
+    for i in range(min(window - 1, len(tp))):
+        mad[i] = np.abs(tp[:i + 1] - tp[:i + 1].mean()).mean() if fillna else np.nan
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = (tp - tp_mean) / (constant * mad)
+
+    return check_fillna(x, value=0, fillna=fillna)
+
+def mass_index(high, low, window_fast : int=9, window_slow : int=25, fillna : bool=False):
+    ema1 = ema(high - low, span=window_fast, fillna=fillna)
+    ema2 = ema(ema1, span=window_fast, fillna=fillna)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = rolling_sum(ema1 / ema2, window_slow, 0 if fillna else window_slow)
+
+    return check_fillna(x, value=0, fillna=fillna)
+
+def stc(close, window_slow : int=50, window_fast : int=23, cycle : int=10, smooth1 : int=3, smooth2 : int=3, fillna : bool=False):
+    macd = ema(close, span=window_fast, fillna=fillna) - ema(close, span=window_slow, fillna=fillna)
+
+    def stoch_k(x):
+        xmin, xmax = rolling_min(x, cycle), rolling_max(x, cycle)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 100 * (x - xmin) / (xmax - xmin)
+
+    stoch_d = ema(stoch_k(macd), span=smooth1, fillna=fillna)
+    x = ema(stoch_k(stoch_d), span=smooth2, fillna=fillna)
+
+    return check_fillna(x, value=0, fillna=fillna)
+
+def kst(close, roc1 : int=10, roc2 : int=15, roc3 : int=20, roc4 : int=30, window1 : int=10, window2 : int=10, window3 : int=10, window4 : int=15, nsig : int=9, fillna : bool=False):
+    close_mean = np.nanmean(close)
+
+    def rocma(r, window):
+        prev = shift(close, r, fill_value=close_mean)
+        return rolling_mean((close - prev) / prev, window, 0 if fillna else window)
+
+    x = 100 * (rocma(roc1, window1) + 2 * rocma(roc2, window2) + 3 * rocma(roc3, window3) + 4 * rocma(roc4, window4))
+    return check_fillna(x, value=0, fillna=fillna)
+
+def trix(close, window : int=15, fillna : bool=False):
+    ema3 = ema(ema(ema(close, span=window, fillna=fillna), span=window, fillna=fillna), span=window, fillna=fillna)
+    prev = shift(ema3, fill_value=np.nanmean(ema3))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = (ema3 - prev) / prev * 100
+
+    return check_fillna(x, value=0, fillna=fillna)
+
+# {(ta class name, ta_func): kernel}
+kernels = {
+    ('RSIIndicator', 'rsi'): rsi,
+    ('TSIIndicator', 'tsi'): tsi,
+    ('UltimateOscillator', 'ultimate_oscillator'): ultimate_oscillator,
+    ('StochasticOscillator', 'stoch'): stoch,
+    ('ROCIndicator', 'roc'): roc,
+    ('AwesomeOscillatorIndicator', 'awesome_oscillator'): awesome_oscillator,
+    ('PercentageVolumeOscillator', 'pvo'): pvo,
+    ('ChaikinMoneyFlowIndicator', 'chaikin_money_flow'): chaikin_money_flow,
+    ('MFIIndicator', 'money_flow_index'): money_flow_index,
+    ('UlcerIndex', 'ulcer_index'): ulcer_index,
+    ('EMAIndicator', 'ema_indicator'): ema_indicator,
+    ('ADXIndicator', 'adx'): adx,
+    ('AroonIndicator', 'aroon_indicator'): aroon_indicator,
+    ('CCIIndicator', 'cci'): cci,
+    ('MassIndex', 'mass_index'): mass_index,
+    ('STCIndicator', 'stc'): stc,
+    ('KSTIndicator', 'kst'): kst,
+    ('TRIXIndicator', 'trix'): trix}
+
+# kernels built only from segment aware primitives, can compute stacked panel in one pass inside segmented()
+# adx, aroon, cci, kst, trix index absolute positions/whole array means, so need one call per segment
+panel_kernels = {rsi, tsi, ultimate_oscillator, stoch, roc, awesome_oscillator, pvo, chaikin_money_flow, money_flow_index, ulcer_index, ema_indicator, mass_index, stc}
+
+def get_kernel(cls, ta_func : str):
+    """Return kernel for ta class + output func, or None if not implemented"""
+    return kernels.get((cls.__name__, ta_func))
+
+@lru_cache(maxsize=None)
+def get_arg_names(func) -> frozenset:
+    """Arg names of func (or class __init__), cached so signals don't call inspect.signature every time"""
+    return frozenset(inspect.signature(func).parameters.keys())
+
+def validate(df : pd.DataFrame, signal_groups : list=None, rtol : float=1e-7, atol : float=1e-9) -> pd.DataFrame:
+    """Compare every cls/ta_func signal in signal groups computed with kernel vs ta
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        OHLCV
+    signal_groups : list, optional
+        initialized SignalGroup objs, default Momentum, Volume, Volatility, Trend
+    rtol : float, optional
+    atol : float, optional
+
+    Returns
+    -------
+    pd.DataFrame
+        one row per signal, max_abs_diff, max_rel_diff, ok
+    """
+    from . import signals as sg
+    signal_groups = signal_groups or [sg.Momentum(), sg.Volume(), sg.Volatility(), sg.Trend()]
+    data = []
+
+    for signal_group in signal_groups:
+        signal_group.df = df
+
+        for name, m in signal_group.signals.items():
+            if not 'cls' in m:
+                continue
+
+            m = {k: v for k, v in m.items() if not k in ('name', 'plot', 'params')}
+            expected = signal_group.make_signal(**m, use_kernel=False).to_numpy(dtype=float)
+            result = np.asarray(signal_group.make_signal(**m, use_kernel=True), dtype=float)
+
+            diff = np.abs(result - expected)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rel = diff / np.abs(expected)
+
+            data.append(dict(
+                signal=name,
+                kernel=get_kernel(m['cls'], m['ta_func']).__name__,
+                max_abs_diff=np.nanmax(diff, initial=0),
+                max_rel_diff=np.nanmax(np.where(np.isfinite(rel), rel, 0), initial=0),
+                ok=np.allclose(result, expected, rtol=rtol, atol=atol, equal_nan=True)))
+
+    return pd.DataFrame(data)
@@ -1,6 +1,7 @@
 import json
 import os
 import sys
+import tempfile
 import time
 from collections import defaultdict
 from datetime import datetime as dt
@@ -16,7 +17,6 @@ from . import (
     functions as f,
     backtest as bt)
 from .database import db
-from .strategies import (trendrev, sfp)
 
 try:
     from IPython.display import display
@@ -490,6 +490,8 @@ def check_sfp(df):
     # send discord alert with the swing fails, and supporting info
     # 'Swing High to xxxx', 'swung highs at xxxx', 'tail = xx%'
     # if one candle swings highs and lows, go with... direction of candle? bigger tail?
+    # strategies subclass backtest classes, import here so importing backtest first doesn't loop back
+    from .strategies import sfp
         
     strat = sfp.Strategy()
     strat.init(df=df)
@@ -630,7 +632,23 @@ def write_balance_google(syms, u, sht=None, ws=None, preservedf=False, df=None):
     ws.set_dataframe(df, (1,1), nan='')
     # return df
     
+def checkpoint_dir() -> Path:
+    """Return writable folder for backtest checkpoints
+    - JAMBOT_CHECKPOINT_DIR env var if set
+    - package folder is read only on azure functions, use temp dir there
+    """
+    p = os.getenv('JAMBOT_CHECKPOINT_DIR')
+    if p:
+        return Path(p)
+
+    if os.getenv('AZURE_FUNCTIONS_ENVIRONMENT'):
+        return Path(tempfile.gettempdir()) / 'jambot_checkpoints'
+
+    return f.topfolder / 'data/checkpoints'
+
 def run_toploop(u=None, partial=False, dfall=None):
+    from .strategies import trendrev
+
     # run every 1 hour, or when called by check_filled_orders()
 
     # Google - get user/position info
@@ -668,14 +686,34 @@ def run_toploop(u=None, partial=False, dfall=None):
             # TREND_REV
             speed = (16, 6)
             norm = (0.004, 0.024)
-            strat = trendrev.Strategy(speed=speed, norm=norm)
-            strat.stoppercent = -0.03
-            strats = [strat]
-
-            sym = bt.Backtest(symbol=symbol, startdate=startdate, strats=strats, row=row, df=df, partial=partial, u=u)
-            if weight <= 0:
-                sym.tradingenabled = False #this should come from strat somehow
-            sym.decide_full()
+
+            # resume from last hour's state if possible, only new candles are processed
+            p_check = checkpoint_dir() / f'{symbol}_trendrev.pkl'
+            sym = bt.Backtest.load_checkpoint(p=p_check, df=df)
+
+            if not sym is None and sym.strats[0].speed == speed and sym.strats[0].norm == norm:
+                strat = sym.strats[0]
+                sym.resume(df=df, partial=partial, u=u)
+            else:
+                strat = trendrev.Strategy(speed=speed, norm=norm)
+                strat.stoppercent = -0.03
+                strats = [strat]
+
+                sym = bt.Backtest(symbol=symbol, startdate=startdate, strats=strats, row=row, df=df, partial=partial, u=u)
+                sym.decide_full()
+
+                # warm up streamed signals so next hour's resume only updates new candles
+                sym.stream = strat.make_stream().fit(sym.df, partial=partial)
+
+            # checkpoint before final_orders, which rescales open trade's orders in place to live balance
+            # partial candle will still change, only checkpoint complete candles, failed save just means full recompute next time
+            if not partial:
+                try:
+                    sym.save_checkpoint(p=p_check)
+                except:
+                    f.send_error(f'{symbol} - save checkpoint')
+
+            sym.tradingenabled = weight > 0 #this should come from strat somehow
             syms.append(sym)
 
             if sym.tradingenabled:
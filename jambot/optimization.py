@@ -1,20 +1,94 @@
+import shutil
+import tempfile
 from pathlib import Path
 from datetime import (datetime as dt, timedelta as delta)
-from joblib import Parallel, delayed
+from joblib import Parallel, cpu_count, delayed
 
+import numpy as np
 import pandas as pd
 
 from . import (
     functions as f,
-    backtest as bt)
+    backtest as bt,
+    indicators as ind,
+    signals as sg)
+from .strategies import trend, trendrev
+
+class SharedCandles():
+    """Multi-symbol candles published once to memory-mapped files, for parallel backtests
+    - pickling only sends file paths + symbol offsets to workers, not the candle data
+    - workers attach to a single symbol's rows without copying (OS shares the mapped pages)
+    """
+    cols = ['Open', 'High', 'Low', 'Close', 'VolBTC']
+
+    def __init__(self, dfall, cols : list=None, p=None):
+        """
+        Parameters
+        ----------
+        dfall : pd.DataFrame
+            candles for all symbols, eg from db.get_dataframe(symbol=None)
+        cols : list, optional
+            numeric cols to share, eg signal cols for presignaled backtests, default OHLCV
+        p : Path, optional
+            folder to write arrays to, default new temp folder
+        """
+        cols = list(cols or self.cols)
+        p = Path(p) if not p is None else Path(tempfile.mkdtemp(prefix='jambot_'))
+        p.mkdir(parents=True, exist_ok=True)
+
+        # index levels (eg panel Symbol, Timestamp) to cols, db.get_dataframe has Timestamp as both index and col
+        dfall = dfall.reset_index(drop=all(name is None or name in dfall.columns for name in dfall.index.names))
+
+        # symbols must be contiguous blocks of rows
+        dfall = dfall.sort_values(['Symbol', 'Timestamp'], kind='mergesort')
+        symbols = dfall.Symbol.to_numpy()
+        i_start = np.flatnonzero(np.r_[True, symbols[1:] != symbols[:-1]])
+        i_end = np.r_[i_start[1:], len(symbols)]
+        offsets = {symbols[i]: (i, j) for i, j in zip(i_start, i_end)}
+
+        np.save(p / 'ohlcv.npy', dfall[cols].to_numpy(dtype=float))
+        np.save(p / 'timestamp.npy', dfall.Timestamp.to_numpy(dtype='datetime64[ns]'))
+
+        f.set_self(vars(), exclude=('dfall', 'symbols', 'i_start', 'i_end'))
+
+    def __getstate__(self):
+        return dict(p=self.p, offsets=self.offsets, cols=self.cols)
+
+    def __setstate__(self, m):
+        self.__dict__.update(m)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def symbols(self) -> list:
+        return list(self.offsets)
+
+    def get_df(self, symbol) -> pd.DataFrame:
+        """Return single symbol df backed by memmapped array, same shape as db.get_dataframe (Timestamp index + Symbol, Timestamp cols)"""
+        i, j = self.offsets[symbol]
+        arr = np.load(self.p / 'ohlcv.npy', mmap_mode='r')[i:j]
+        timestamps = pd.DatetimeIndex(np.load(self.p / 'timestamp.npy', mmap_mode='r')[i:j], name='Timestamp')
+
+        # NOTE df.assign would deep copy the mapped block, insert cols instead
+        df = pd.DataFrame(data=arr, columns=self.cols, index=timestamps, copy=False)
+        df.insert(0, 'Symbol', symbol)
+        df.insert(1, 'Timestamp', timestamps)
+
+        return df
+
+    def close(self):
+        """Delete memmapped files"""
+        shutil.rmtree(self.p, ignore_errors=True)
 
 def run_trend(symbol, startdate, df, against, wth, row, titles):
     dfTemp = pd.DataFrame(columns=[titles[0], titles[1], 'min', 'max', 'final', 'numtrades'])
 
     # Strat_Trend
-    trend = bt.Strat_Trend(speed=(against, wth))
-    strats = []
-    strats.append(trend)
+    strats = [trend.Strategy(speed=(against, wth))]
 
     sym = bt.Backtest(symbol=symbol, startdate=startdate, strats=strats, df=df, row=row)
     sym.decide_full()
@@ -33,15 +107,92 @@ def run_parallel():
     dfall = f.read_csv(startdate, daterange, symbol=symbol)
 
     for row in dfsym.itertuples():
-        strattype = 'trendrev'
         norm = (0.004, 0.024)
-        syms = Parallel(n_jobs=-1)(delayed(run_single)(strattype, startdate, dfall, speed0, speed1, row, norm) for speed0 in range(6, 27, 1) for speed1 in range(6, 18, 1))
+        df_results = run_sweep(df=dfall, row=row, startdate=startdate, speeds0=range(6, 27, 1), speeds1=range(6, 18, 1), norm=norm)
+
+    return df_results
+
+def run_sweep(df, row, startdate, speeds0, speeds1, norm=(0.004, 0.024), offset=1, n_jobs=-1) -> pd.DataFrame:
+    """Run trendrev backtests for every (speed0, speed1) combination, sharing signal cols
+
+    - speed independent signals (emas, macd, volatility etc) computed once, not once per combination
+    - rolling High/Low extrema for all windows built from one shared sparse table, then combined into pxhigh/pxlow
+    - each worker gets df once per batch of combinations and returns compact result rows only
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        single symbol candles
+    row : namedtuple
+        row from symbols.csv
+    startdate : dt
+    speeds0, speeds1 : iterable
+        against/with speeds to test
+    norm : tuple, optional
+    offset : int, optional
+        shift rolling extrema, same as sg.EMA offset, default 1
+
+    Returns
+    -------
+    pd.DataFrame
+        one row of against, wth, min, max, final, numtrades per combination
+    """
+    # build speed independent signals once with trendrev's own signal groups (pxhigh/pxlow replaced per combination)
+    strat = trendrev.Strategy(speed=(speeds0[0], speeds1[0]), norm=norm)
+    df_base = sg.SignalManager().add_signals(df=df[df.index >= startdate], signals=list(strat.get_signals().values()))
+
+    m_ext = ind.rolling_extrema(high=df_base.High.to_numpy(), low=df_base.Low.to_numpy(), windows=set(speeds0) | set(speeds1), offset=offset)
+    is_long, is_short = (df_base.ema_trend == 1).to_numpy(), (df_base.ema_trend == -1).to_numpy()
+
+    # pxhigh/pxlow only depend on speed, build from cached extrema (same as sg.EMA)
+    combos = [
+        ((against, wth),
+        np.where(is_long, m_ext[('High', against)], m_ext[('High', wth)]),
+        np.where(is_short, m_ext[('Low', against)], m_ext[('Low', wth)]))
+        for against in speeds0 for wth in speeds1]
+
+    # one batch per worker (joblib n_jobs=-1 is all cpus, -2 all but one etc)
+    n_workers = cpu_count() + 1 + n_jobs if n_jobs < 0 else n_jobs
+    n_batches = max(1, min(len(combos), n_workers))
+    batches = [combos[i::n_batches] for i in range(n_batches)]
+
+    # workers attach to memmapped signal cols instead of unpickling df_base per batch
+    cols = df_base.select_dtypes('number').columns.to_list()
+    with SharedCandles(dfall=df_base.assign(Symbol=row.symbol), cols=cols) as candles:
+        results = Parallel(n_jobs=n_jobs)(delayed(run_sweep_batch)(candles, row, startdate, norm, batch) for batch in batches)
+
+    return pd.DataFrame([m for lst in results for m in lst]) \
+        .sort_values(['against', 'wth']) \
+        .reset_index(drop=True)
+
+def run_sweep_batch(candles, row, startdate, norm, combos) -> list:
+    """Run presignaled trendrev backtest for each (speed, pxhigh, pxlow) in combos"""
+    df = candles.get_df(symbol=row.symbol)
+    lst = []
+
+    for speed, pxhigh, pxlow in combos:
+        df['pxhigh'], df['pxlow'] = pxhigh, pxlow
+
+        strat = trendrev.Strategy(speed=speed, norm=norm)
+        strat.slippage = 0
+        strat.stoppercent = -0.03
+        strat.presignaled = True
 
-    return syms
+        sym = bt.Backtest(symbol=row.symbol, startdate=startdate, strats=[strat], df=df, row=row, partial=False)
+        sym.decide_full()
 
-def run_single(strattype, startdate, dfall, speed0, speed1, row=None, norm=None, symbol=None):
-    import backtest as bt
+        a = sym.account
+        lst.append(dict(
+            against=speed[0],
+            wth=speed[1],
+            min=round(a.min, 3),
+            max=round(a.max, 3),
+            final=round(a.balance, 3),
+            numtrades=strat.tradecount()))
+
+    return lst
 
+def run_single(strattype, startdate, dfall, speed0, speed1, row=None, norm=None, symbol=None):
     if not row is None:
         symbol = row.symbol
     df = f.filter_df(dfall, symbol)
@@ -49,13 +200,13 @@ def run_single(strattype, startdate, dfall, speed0, speed1, row=None, norm=None,
     speed = (speed0, speed1)
 
     if strattype == 'trendrev':
-        strat = bt.Strat_TrendRev(speed=speed, norm=norm)
+        strat = trendrev.Strategy(speed=speed, norm=norm)
         strat.slippage = 0
         strat.stoppercent = -0.03
         
     elif strattype == 'trend':
         speed = (row.against, row.withspeed)
-        strat = bt.Strat_Trend(speed=speed)
+        strat = trend.Strategy(speed=speed)
         strat.slippage = 0.002
 
     sym = bt.Backtest(symbol=symbol, startdate=startdate, strats=[strat], df=df, row=row, partial=False)
@@ -65,7 +216,7 @@ def run_single(strattype, startdate, dfall, speed0, speed1, row=None, norm=None,
 
 def run_trendrev(symbol, startdate, df, against, wth, row, titles, norm):   
     # Strat_TrendRev
-    strat = bt.Strat_TrendRev(speed=(against, wth), norm=norm)
+    strat = trendrev.Strategy(speed=(against, wth), norm=norm)
     sym = bt.Backtest(symbol=symbol, startdate=startdate, strats=[strat], df=df, row=row)
     sym.decide_full()
 
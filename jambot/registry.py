@@ -0,0 +1,297 @@
+"""Versioned on-disk registry of trained ModelManager pipes (ct > pca > model)
+- each version is a folder of small native artifacts + meta.json, eg data/models/lgbm/v3
+    - meta.json: features, target, training range, metrics, model params
+    - transform.npz: ct + pca folded into one affine map (x @ weights + bias), if all ct encoders are linear scalers
+    - booster.txt: LightGBM native model
+    - transform.pkl/model.pkl: pickle fallback for any other steps/models
+- load() only reads meta.json, artifacts are loaded on first use, so live inference doesn't import sklearn
+"""
+import json
+import os
+import pickle
+import shutil
+from datetime import datetime as dt
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import functions as f
+
+# linear ct encoders, fitted encoder > (scale, offset) per output col, x * scale + offset
+_scalers = dict(
+    MinMaxScaler=lambda enc: (enc.scale_, enc.min_) if not getattr(enc, 'clip', False) else None,
+    StandardScaler=lambda enc: _center_scale(enc.mean_, enc.scale_, enc.n_features_in_),
+    RobustScaler=lambda enc: _center_scale(enc.center_, enc.scale_, enc.n_features_in_),
+    MaxAbsScaler=lambda enc: (1 / enc.scale_, np.zeros(enc.n_features_in_)),
+    FunctionTransformer=lambda enc: (np.ones(enc.n_features_in_), np.zeros(enc.n_features_in_)) if enc.func is None else None) # fitted 'passthrough'
+
+def _center_scale(center, scale, n):
+    """(x - center) / scale as (scale, offset), either can be None if disabled in encoder"""
+    scale = np.ones(n) if scale is None else np.asarray(scale, dtype=float)
+    center = np.zeros(n) if center is None else np.asarray(center, dtype=float)
+    return 1 / scale, -center / scale
+
+def get_affine(steps : list, columns : list=None) -> tuple:
+    """Fold fitted ColumnTransformer (+ optional PCA) into x[features] @ weights + bias
+
+    Parameters
+    ----------
+    steps : list
+        fitted pipe steps before model, eg [('ct', ct), ('pca', pca)]
+    columns : list, optional
+        cols of df ct was fit on, needed to resolve int/slice selectors if ct has no feature_names_in_ (sklearn < 1.0)
+
+    Returns
+    -------
+    tuple
+        (features, weights, bias), or None if any step isn't linear
+    """
+    if not 1 <= len(steps) <= 2 or not type(steps[0][1]).__name__ == 'ColumnTransformer':
+        return None
+
+    ct = steps[0][1]
+    names_in = getattr(ct, 'feature_names_in_', None)
+    if names_in is None and not columns is None:
+        names_in = np.asarray(columns, dtype=object)
+
+    features, scale, offset = [], [], []
+
+    for _, enc, cols in ct.transformers_:
+        if isinstance(enc, str) and enc == 'drop':
+            continue
+
+        # resolve col names, remainder and int/slice/mask selectors index into feature_names_in_
+        if callable(cols):
+            return None
+
+        if isinstance(cols, str):
+            cols = [cols]
+
+        if isinstance(cols, slice):
+            if names_in is None:
+                return None
+
+            # str slice is label based and inclusive, same as ColumnTransformer
+            if isinstance(cols.start, str) or isinstance(cols.stop, str):
+                names = list(names_in)
+                i = names.index(cols.start) if not cols.start is None else None
+                j = names.index(cols.stop) + 1 if not cols.stop is None else None
+                cols = slice(i, j, cols.step)
+
+            cols = names_in[cols]
+
+        cols = np.asarray(cols)
+        if cols.dtype.kind in 'iub':
+            if names_in is None:
+                return None
+
+            cols = names_in[cols]
+
+        if len(cols) == 0:
+            continue
+
+        if isinstance(enc, str) and enc == 'passthrough':
+            m = (np.ones(len(cols)), np.zeros(len(cols)))
+        else:
+            func = _scalers.get(type(enc).__name__)
+            m = func(enc) if not func is None else None
+
+        if m is None:
+            return None
+
+        features.extend(str(c) for c in cols)
+        scale.append(np.asarray(m[0], dtype=float))
+        offset.append(np.asarray(m[1], dtype=float))
+
+    scale, offset = np.concatenate(scale), np.concatenate(offset)
+    weights, bias = np.diag(scale), offset
+
+    if len(steps) == 2:
+        pca = steps[1][1]
+        if not type(pca).__name__ == 'PCA':
+            return None
+
+        # (x * scale + offset - mean) @ components.T, / sqrt(explained_variance) if whiten
+        components = pca.components_.T
+        if pca.whiten:
+            components = components / np.sqrt(pca.explained_variance_)
+
+        weights, bias = weights @ components, (bias - pca.mean_) @ components
+
+    return features, weights, bias
+
+class RegisteredModel():
+    """Single saved model version, artifacts loaded lazily on first transform/predict"""
+    def __init__(self, p : Path):
+        p = Path(p)
+        meta = json.loads((p / 'meta.json').read_text())
+        _transform = None
+        _model = None
+        f.set_self(vars())
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.meta["name"]}, v{self.meta["version"]})'
+
+    @property
+    def features(self) -> list:
+        return self.meta['features']
+
+    @property
+    def transformer(self):
+        """(weights, bias) or fitted sklearn steps"""
+        if self._transform is None:
+            if self.meta['transform'] == 'affine':
+                with np.load(self.p / 'transform.npz') as data:
+                    self._transform = (data['weights'], data['bias'])
+            else:
+                with open(self.p / 'transform.pkl', 'rb') as file:
+                    self._transform = pickle.load(file)
+
+        return self._transform
+
+    @property
+    def model(self):
+        """lightgbm Booster or fitted sklearn model"""
+        if self._model is None:
+            if self.meta['model'] == 'booster':
+                import lightgbm as lgb
+                self._model = lgb.Booster(model_file=str(self.p / 'booster.txt'))
+            else:
+                with open(self.p / 'model.pkl', 'rb') as file:
+                    self._model = pickle.load(file)
+
+        return self._model
+
+    def transform(self, x) -> np.ndarray:
+        """Return model input matrix from df of features (or ndarray already in features order)"""
+        if self.meta['transform'] == 'affine':
+            if isinstance(x, pd.DataFrame):
+                x = x[self.features].to_numpy(dtype=float)
+
+            weights, bias = self.transformer
+            return x @ weights + bias
+
+        if not isinstance(x, pd.DataFrame):
+            x = pd.DataFrame(x, columns=self.features)
+
+        return self.transformer.transform(x)
+
+    def predict_proba(self, x) -> np.ndarray:
+        """Return proba of each class in meta['classes'] order"""
+        x = self.transform(x)
+
+        if not self.meta['model'] == 'booster':
+            return self.model.predict_proba(x)
+
+        proba = self.model.predict(x)
+        return np.column_stack([1 - proba, proba]) if proba.ndim == 1 else proba
+
+    def predict(self, x) -> np.ndarray:
+        classes = self.meta.get('classes')
+        if not classes is None:
+            return np.asarray(classes)[self.predict_proba(x).argmax(axis=1)]
+
+        return self.model.predict(self.transform(x))
+
+class ModelRegistry():
+    """Versioned store of trained pipes, eg data/models/{name}/v{version}"""
+    def __init__(self, p=None):
+        p = Path(p or f.topfolder / 'data/models')
+        f.set_self(vars())
+
+    def versions(self, name : str) -> list:
+        p = self.p / name
+        if not p.exists():
+            return []
+
+        return sorted(int(p_ver.name[1:]) for p_ver in p.iterdir() if p_ver.name.startswith('v') and p_ver.name[1:].isdigit())
+
+    def save(self, name : str, pipe, x_train : pd.DataFrame, target : str=None, metrics : dict=None, **kw) -> RegisteredModel:
+        """Save fitted pipe as new version
+
+        Parameters
+        ----------
+        name : str
+        pipe : Pipeline
+            fitted pipe, final step is model
+        x_train : pd.DataFrame
+            data pipe was fit on, used for feature list + training range
+        target : str, optional
+        metrics : dict, optional
+            eg mean cross val scores
+        kw :
+            extra json serializable meta
+
+        Returns
+        -------
+        RegisteredModel
+        """
+        version = max(self.versions(name), default=0) + 1
+        p = self.p / name / f'v{version}'
+        p_tmp = p.with_name(f'.{p.name}.tmp')
+        shutil.rmtree(p_tmp, ignore_errors=True)
+        p_tmp.mkdir(parents=True)
+
+        steps, model = pipe.steps[:-1], pipe.steps[-1][1]
+
+        affine = get_affine(steps, columns=x_train.columns)
+        if not affine is None:
+            features, weights, bias = affine
+            np.savez(p_tmp / 'transform.npz', weights=weights, bias=bias)
+        else:
+            features = [str(c) for c in x_train.columns]
+            with open(p_tmp / 'transform.pkl', 'wb') as file:
+                pickle.dump(pipe[:-1], file)
+
+        # LightGBM native text format, loads without sklearn/pickle
+        is_booster = hasattr(model, 'booster_')
+        if is_booster:
+            model.booster_.save_model(str(p_tmp / 'booster.txt'))
+        else:
+            with open(p_tmp / 'model.pkl', 'wb') as file:
+                pickle.dump(model, file)
+
+        index = x_train.index
+        classes = getattr(model, 'classes_', None)
+
+        meta = dict(
+            name=name,
+            version=version,
+            created=dt.now().isoformat(timespec='seconds'),
+            transform='affine' if not affine is None else 'pickle',
+            model='booster' if is_booster else 'pickle',
+            model_cls=type(model).__name__,
+            params={k: v for k, v in model.get_params().items() if isinstance(v, (str, int, float, bool, type(None)))},
+            features=features,
+            target=target,
+            classes=classes.tolist() if not classes is None else None,
+            train_start=str(index[0]) if len(index) else None,
+            train_end=str(index[-1]) if len(index) else None,
+            train_rows=len(index),
+            metrics={k: float(v) for k, v in (metrics or {}).items()},
+            **kw)
+
+        (p_tmp / 'meta.json').write_text(json.dumps(meta, indent=4))
+        os.replace(p_tmp, p)
+
+        return RegisteredModel(p)
+
+    def load(self, name : str, version : int=None) -> RegisteredModel:
+        """Load meta of version (default latest), artifacts are loaded on first use"""
+        versions = self.versions(name)
+        if not versions:
+            raise FileNotFoundError(f'No saved versions of model: {name}')
+
+        version = versions[-1] if version is None else version
+        return RegisteredModel(self.p / name / f'v{version}')
+
+    def df_versions(self, name : str) -> pd.DataFrame:
+        """Return df of meta (excluding features/params) for all versions of model"""
+        data = [self.load(name, version).meta for version in self.versions(name)]
+        if not data:
+            return pd.DataFrame()
+
+        return pd.DataFrame(data) \
+            .drop(columns=['features', 'params', 'classes'], errors='ignore') \
+            .set_index('version')
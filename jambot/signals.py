@@ -1,7 +1,12 @@
+import hashlib
 import inspect
+import os
 import re
+import shutil
 import sys
+import warnings
 from collections import defaultdict as dd
+from time import time
 import operator as opr
 
 import numpy as np
@@ -10,6 +15,7 @@ import peakutils
 import ta
 import talib as tb
 from findiff import FinDiff
+from joblib import Parallel, delayed
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.preprocessing import MinMaxScaler
 from ta.momentum import (AwesomeOscillatorIndicator, KAMAIndicator,
@@ -26,6 +32,7 @@ from ta.volume import (AccDistIndexIndicator, ChaikinMoneyFlowIndicator,
 
 from . import charts as ch
 from . import functions as f
+from . import indicators as ind
 from . import sklearn_helper_funcs as sf
 
 """
@@ -83,11 +90,23 @@ drop
 """
 
 class SignalManager(BaseEstimator, TransformerMixin):
-    def __init__(self, signals_list : list=None, target: str=None, prefix: str=None):
+    def __init__(self, signals_list : list=None, target: str=None, prefix: str=None, cache=False, n_jobs : int=1, backend : str='threading', dtype_policy : str=None):
         # df_orig = df.copy()
         signal_groups = {}
         features = {} # map of {feature_name: signal_group}
         scaler = MinMaxScaler()
+
+        # True for default on-disk cache, or pass SignalCache obj
+        cache = SignalCache() if cache is True else (cache or None)
+
+        # 'threading' shares df between groups (ta/numpy release the GIL), 'loky' for processes
+        if not backend in ('threading', 'loky', 'multiprocessing'):
+            raise ValueError(f'Invalid backend: {backend}')
+
+        # None keeps float64, 'compact' downcasts new cols (see downcast), eg for large ml feature frames
+        if not dtype_policy in (None, 'compact'):
+            raise ValueError(f'Invalid dtype_policy: {dtype_policy}')
+
         f.set_self(vars())
     
     def transform(self, df, **transform_params):
@@ -138,8 +157,29 @@ class SignalManager(BaseEstimator, TransformerMixin):
         return self.cols
         # return self.df.columns.to_list()
 
-    def add_signals(self, df, signals : list=None, signal_params : dict=None, **kw) -> pd.DataFrame:
-        """Add multiple initialized signals to dataframe"""
+    def add_signals(self, df, signals : list=None, signal_params : dict=None, outputs : list=None, n_jobs : int=None, **kw) -> pd.DataFrame:
+        """Add multiple initialized signals to dataframe
+        - each col is computed once, in dependency order (see get_plan)
+        - cols consumed from other groups (eg ema50) are reused if already in df
+        - signal groups' drop_cols are only dropped after all groups are added
+        - if n_jobs != 1, independent groups (eg Momentum, Volume, Volatility after base emas) run concurrently
+        - if dtype_policy='compact', group's cols are downcast as soon as no later group consumes them
+        - df can be a multi symbol panel with (Symbol, Timestamp) MultiIndex, see add_panel_signals
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+        signals : list, optional
+            SignalGroup objs or str names of SignalGroup classes, default self.signals_list
+        outputs : list, optional
+            only compute these cols and what they depend on, default all cols of signals
+        n_jobs : int, optional
+            workers per dependency level (joblib style, -1 = all cpus), default self.n_jobs
+
+        Returns
+        -------
+        pd.DataFrame
+        """
         # df = self.df
         if signals is None:
             signals = self.signals_list
@@ -150,20 +190,277 @@ class SignalManager(BaseEstimator, TransformerMixin):
         signal_params = signal_params or {}
 
         # SignalGroup obj, not single column
+        signal_groups = []
         for signal_group in signals or []:
 
             # if str, init obj with defauls args
             if isinstance(signal_group, str):
                 signal_group = getattr(sys.modules[__name__], signal_group)(target=self.target)
             
-            self.signal_groups[signal_group.__class__.__name__.lower()] = signal_group
+            signal_groups.append(signal_group)
+
+        if is_panel(df):
+            return self.add_panel_signals(df=df, signal_groups=signal_groups, outputs=outputs, n_jobs=n_jobs, **kw)
+
+        cache = self.cache if not kw else None # extra kws (eg params) bypass cache
+        if not cache is None:
+            cache.set_data(df)
+
+        n_jobs = self.n_jobs if n_jobs is None else n_jobs
+        drop_cols = []
+        plan = self.get_plan(df=df, signal_groups=signal_groups, outputs=outputs)
+        cols_in = df.columns.to_list()
+
+        # downcast early to keep peak memory low, but keep full precision for cols later groups consume
+        compact = self.dtype_policy == 'compact'
+        consumed = {col for g, features in plan for feature in (features or list(g.signals or {}) or [None]) for col in g.feature_requires(feature)}
 
-            signal_group.df = df # NOTE kinda sketch
-            df = df.pipe(signal_group.add_all_signals, **kw)
+        def _downcast(df, signal_groups):
+            cols = [col for g in signal_groups for col in g.col_features if col in df.columns and not col in consumed]
+            return downcast(df, cols=[col for col in cols if not col in cols_in]) if compact else df
+
+        if n_jobs == 1:
+            for signal_group, features in plan:
+                with f.profile_stage(f'signals.{signal_group.__class__.__name__}'):
+                    df = add_group_signals(df=df, signal_group=signal_group, features=features, cache=cache, **kw)
+
+                self.signal_groups[signal_group.__class__.__name__.lower()] = signal_group
+                drop_cols.extend(signal_group.drop_cols)
+                df = _downcast(df, [signal_group])
+        else:
+            # groups in same level only depend on earlier levels, run concurrently then merge their cols
+            levels = self.get_plan(df=df, signal_groups=signal_groups, outputs=outputs, levels=True)
+            parallel = Parallel(n_jobs=n_jobs, backend=self.backend)
+            cols = df.columns.to_list()
+            group_cols = {} # {group idx in sequential plan: new cols}
+
+            for i, level in enumerate(levels):
+                with f.profile_stage(f'signals.level{i}'):
+                    results = parallel(
+                        delayed(add_group_signals)(df=df, signal_group=signal_group, features=features, cache=cache, new_only=True, **kw)
+                        for signal_group, features, _ in level)
+
+                # processes return copies of groups/cache keys, keep them so state matches sequential mode
+                for (_, _, i_seq), (df_new, signal_group, col_keys) in zip(level, results):
+                    group_cols[i_seq] = [c for c in df_new.columns if not c in df.columns]
+                    df = df.drop(columns=[c for c in df_new.columns if c in df.columns]).join(df_new)
+
+                    if not cache is None:
+                        cache.col_keys.update(col_keys)
+
+                    self.signal_groups[signal_group.__class__.__name__.lower()] = signal_group
+                    drop_cols.extend(signal_group.drop_cols)
+
+                df = _downcast(df, [signal_group for _, signal_group, _ in results])
+
+            # same col order as sequential mode
+            df = df[cols + [c for i in sorted(group_cols) for c in group_cols[i]]]
+
+        drop_cols = [col for col in set(drop_cols) if col in df.columns and not col in (outputs or [])]
+        df = df.drop(columns=drop_cols)
+
+        if compact:
+            df = downcast(df, cols=[col for col in df.columns if not col in cols_in])
 
         self.df = df
 
         return df
+
+    def add_panel_signals(self, df, signal_groups : list, outputs : list=None, n_jobs : int=None, **kw) -> pd.DataFrame:
+        """Add signals to multi symbol panel without cols bleeding across symbol boundaries
+        - kernel ta signals (indicators.panel_kernels) and base emas are computed for all symbols in one pass on the
+            stacked panel, with indicators.segmented restarting rolling/ewm/shift at each symbol's first row
+        - remaining features (pandas lambdas, kernels which index absolute positions eg adx) run per symbol slice,
+            with panel pass cols already in df, groups within each symbol run concurrently (n_jobs)
+        - groups are reset before each symbol, so no per df state carries over between symbols
+        - panel pass cols don't use cache
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            candles with (Symbol, Timestamp) MultiIndex, eg db.get_dataframe(symbol=None, panel=True)
+        signal_groups : list
+            initialized SignalGroup objs
+        outputs : list, optional
+        n_jobs : int, optional
+
+        Returns
+        -------
+        pd.DataFrame
+            panel with same index as df
+        """
+        index = df.index
+        cols_in = df.columns.to_list()
+
+        # segments need each symbol's rows contiguous, ids are in order of first appearance so contiguous = non decreasing
+        ids = pd.factorize(index.get_level_values('Symbol'))[0]
+        if (np.diff(ids) < 0).any():
+            order = np.argsort(ids, kind='stable')
+            df, ids = df.iloc[order], ids[order]
+
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        plan = self.get_plan(df=df, signal_groups=signal_groups, outputs=outputs)
+
+        # stacked pass, RangeIndex so funcs returning series (eg get_ema) don't align on duplicate timestamps
+        x = df.reset_index(drop=True)
+        m_panel = {}
+
+        with ind.segmented(starts=starts, n=len(x)):
+            for signal_group, features in plan:
+                if signal_group.is_atomic:
+                    continue
+
+                signal_group.df = x
+                for col, feature in signal_group.col_features.items():
+                    if not features is None and not feature in features:
+                        continue
+
+                    m = signal_group.signals.get(feature, {})
+                    if signal_group.panel_funcs and 'func' in m:
+                        m_panel[col] = np.asarray(m['func'](x))
+                    elif 'cls' in m and signal_group.use_kernels and ind.get_kernel(m['cls'], m['ta_func']) in ind.panel_kernels:
+                        m_panel[col] = np.asarray(signal_group.make_signal(**m))
+
+                signal_group.reset()
+
+        df = df.assign(**m_panel)
+
+        # features which still need per symbol slices
+        produces = [col for signal_group in signal_groups for col in signal_group.produces]
+        remaining = [col for col in outputs or produces if not col in m_panel]
+
+        if remaining:
+            symbols, dfs = [], []
+
+            for symbol, df_sym in df.groupby(level='Symbol', sort=False):
+                for signal_group in signal_groups:
+                    signal_group.reset()
+
+                with f.profile_stage(f'signals.{symbol}'):
+                    df_sym = self.add_signals(df=df_sym.droplevel('Symbol'), signals=signal_groups, outputs=remaining, n_jobs=n_jobs, **kw)
+
+                symbols.append(symbol)
+                dfs.append(df_sym)
+
+            df = pd.concat(dfs, keys=symbols, names=['Symbol']) \
+                .reorder_levels(index.names)
+
+            for signal_group in signal_groups:
+                signal_group.reset()
+
+        # drop cols of groups which only ran in panel pass
+        drop_cols = {col for signal_group, _ in plan for col in signal_group.drop_cols}
+        df = df.drop(columns=[col for col in drop_cols if col in df.columns and not col in (outputs or [])])
+
+        if self.dtype_policy == 'compact':
+            df = downcast(df, cols=[col for col in df.columns if not col in cols_in])
+
+        if not df.index.equals(index):
+            df = df.reindex(index)
+
+        self.signal_groups.update({signal_group.__class__.__name__.lower(): signal_group for signal_group, _ in plan})
+        self.df = df
+        return df
+
+    def get_plan(self, df, signal_groups : list, outputs : list=None, levels : bool=False) -> list:
+        """Resolve dependency DAG of signal cols, return groups to compute in order with only the features needed
+
+        - each group declares cols it produces, and cols it consumes (feature requires + group.requires)
+        - emaN cols not produced by any group are added by a BaseEMA group
+        - cols requested as outputs are always (re)computed, other cols already in df are reused
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+        signal_groups : list
+            initialized SignalGroup objs
+        outputs : list, optional
+            cols to compute, default all cols produced by signal_groups
+        levels : bool, optional
+            group plan into dependency levels, groups in same level only depend on earlier levels, default False
+
+        Returns
+        -------
+        list
+            [(signal_group, features)], features is None if group computes all its cols at once
+            or [[(signal_group, features, idx in sequential plan)]] per level if levels=True
+        """
+        col_map = {} # {col: (signal_group, feature_name)}
+        for signal_group in signal_groups:
+            for col, feature in signal_group.col_features.items():
+                col_map.setdefault(col, (signal_group, feature))
+
+        if outputs is None:
+            outputs = [col for signal_group in signal_groups for col in signal_group.produces]
+
+        unknown = [col for col in outputs if not col in col_map and not re.match(r'^ema\d+$', col)]
+        if unknown:
+            raise ValueError(f'No signal group produces cols: {unknown}')
+
+        base_emas = []
+        features = dd(set) # {signal_group: features needed}
+        deps = dd(set) # {signal_group: groups it depends on}
+        queue, seen = list(outputs), set()
+
+        while queue:
+            col = queue.pop()
+            if col in seen:
+                continue
+            seen.add(col)
+
+            if not col in col_map:
+                # emaN consumed by other groups
+                base_emas.append(int(col[3:]))
+                continue
+
+            signal_group, feature = col_map[col]
+            features[signal_group].add(feature)
+
+            for col_req in signal_group.feature_requires(feature):
+                if col_req in df.columns and not col_req in outputs:
+                    continue
+
+                if col_req in col_map:
+                    dep_group = col_map[col_req][0]
+                elif re.match(r'^ema\d+$', col_req):
+                    dep_group = 'base_ema'
+                else:
+                    continue # not a col, eg 'rolling'
+
+                if not dep_group is signal_group:
+                    deps[signal_group].add(dep_group)
+
+                queue.append(col_req)
+
+        ordered = []
+        level = {} # {signal_group: longest dependency chain before group}
+        if base_emas:
+            base_ema = BaseEMA(emas=sorted(base_emas))
+            features[base_ema] = set(base_ema.signals)
+            ordered.append(base_ema)
+            level[base_ema] = level['base_ema'] = 0
+
+        # topological sort, keep order signals were passed when no dependency between groups
+        todo = [g for g in signal_groups if g in features]
+        while todo:
+            ready = [g for g in todo if all(dep in level for dep in deps[g])]
+            if not ready:
+                raise ValueError(f'Circular signal dependencies: {[g.__class__.__name__ for g in todo]}')
+
+            g = ready[0]
+            level[g] = max([level[dep] + 1 for dep in deps[g]] + [0])
+            ordered.append(g)
+            todo.remove(g)
+
+        plan = [(g, None if g.is_atomic else features[g]) for g in ordered]
+
+        if not levels:
+            return plan
+
+        # keep idx in sequential plan so results can be merged in same order
+        return [
+            [(g, feats, i_seq) for i_seq, (g, feats) in enumerate(plan) if level[g] == i]
+            for i in sorted(set(level[g] for g in ordered))]
     
     def show_signals(self):
         m = dd(dict)
@@ -177,17 +474,35 @@ class SignalManager(BaseEstimator, TransformerMixin):
 
         sf.pretty_dict(m)
 
-    def replace_single_feature(self, df, feature_params : dict, **kw) -> pd.DataFrame:
-        """Generator to replace single feature at a time with new values from params dict"""
+    def replace_single_feature(self, df, feature_params : dict, incremental : bool=False, **kw) -> pd.DataFrame:
+        """Generator to replace single feature at a time with new values from params dict
 
+        Parameters
+        ----------
+        df : pd.DataFrame
+        feature_params : dict
+            eg {'mnt_rsi_2': {'window': [2, 6, 12]}}
+        incremental : bool, optional
+            yield only {col: values} of recomputed cols instead of full df copy, default False
+
+        Yields
+        ------
+        (pd.DataFrame | dict, str)
+            df (or dict of recomputed cols if incremental), eg 'mnt_rsi_2_window_12'
+        """
         for feature_name, m in feature_params.items():
             # get signal group from feature_name
             signal_group = self.get_signal_group(feature_name=feature_name)
 
             for param, vals in m.items():
                 for val in vals:
-                    param_single = {feature_name: {param: val}} # eg {'mnt_rsi': {'window': 12}}
-                    yield df.pipe(signal_group.assign_signals, params=param_single), f'{feature_name}_{param}_{val}'
+                    name = f'{feature_name}_{param}_{val}'
+
+                    if incremental:
+                        yield signal_group.make_feature(df=df, feature_name=feature_name, params={param: val}), name
+                    else:
+                        param_single = {feature_name: {param: val}} # eg {'mnt_rsi': {'window': 12}}
+                        yield df.pipe(signal_group.assign_signals, params=param_single), name
 
     def make_plot_traces(self, name) -> list:
         """Create list of dicts for plot traces"""
@@ -217,11 +532,60 @@ class SignalGroup():
         close='Close',
         volume='VolBTC')
 
-    def __init__(self, target=None, df=None, signals=None, fillna=True, prefix: str=None, **kw):
+    requires = [] # cols consumed by all features, eg in custom add_all_signals, per feature cols are declared as dict(func=..., requires=[cols])
+    use_kernels = True # compute ta signals with indicators.py NumPy kernels
+    panel_funcs = False # signal funcs only use segment aware indicators.py funcs, safe on stacked panel (see SignalManager.add_panel_signals)
+    extra_cols = [] # cols produced outside of self.signals, eg by custom add_all_signals
+
+    def __init__(self, target=None, df=None, signals=None, fillna=True, prefix: str=None, weight : float=1, **kw):
         drop_cols = []
         signals = self.init_signals(signals)
         f.set_self(vars())
 
+    def reset(self):
+        """Clear state from last df group was computed on"""
+        self.df = None
+
+    @property
+    def is_atomic(self) -> bool:
+        """Group doesn't build from self.signals, so all cols must be computed together"""
+        return not self.signals
+
+    @property
+    def col_features(self) -> dict:
+        """Return dict of {col: feature_name} for all cols group creates, including intermediate drop_cols"""
+        m = {f'{self.prefix}_{name}' if self.prefix else name: name for name in self.signals or {}}
+        return {**m, **{col: None if self.is_atomic else col for col in self.extra_cols}}
+
+    @property
+    def produces(self) -> list:
+        """Output cols of group (not dropped)"""
+        return [col for col in self.col_features if not col in self.drop_cols]
+
+    def feature_requires(self, feature : str=None) -> set:
+        """Return names of all cols a feature consumes, group + feature's declared requires
+        - ta cls signals consume OHLCV (m_default)
+        - func signals without requires fall back to names in func bytecode (superset, non col names ignored by SignalManager), with warning
+        """
+        cols = set(self.requires)
+
+        if self.is_atomic or not feature in (self.signals or {}):
+            return cols
+
+        m = self.signals[feature]
+        if 'requires' in m:
+            cols |= set(m['requires'])
+        elif 'cls' in m:
+            cols |= set(self.m_default.values())
+        elif 'func' in m:
+            # fallback for funcs without declared requires, bytecode names miss cols built at runtime (eg x[f'ema{p}'])
+            warnings.warn(
+                f'{self.__class__.__name__}.{feature} has no declared requires, inferring consumed cols from func. '
+                'Use dict(func=..., requires=[cols]).', stacklevel=2)
+            cols |= get_func_names(m['func'])
+
+        return cols
+
     def init_signals(self, signals):
         """Extra default processing to signals, eg add plot func"""
         if signals is None:
@@ -245,16 +609,103 @@ class SignalGroup():
 
         return signals
     
-    def add_all_signals(self, df, **kw):
-        """Convenience base wrapper to work with ta/non-ta signals"""
-        df = df.pipe(self.assign_signals, **kw)
+    def feature_key(self, feature : str=None) -> str:
+        """Return str of everything which defines a feature's values (excluding input data), used for cache keys
+        - signals built from self.signals only use that feature's own params/func, so changing one feature doesn't invalidate others
+        - atomic groups/extra cols use all simple group attrs + add_all_signals code
+        """
+        name = self.__class__.__name__
+
+        if not self.is_atomic and feature in (self.signals or {}):
+            m = self.signals[feature]
+            items = []
+            for k, v in sorted(m.items()):
+                if k in ('plot', 'params', 'name'):
+                    continue
+                elif inspect.isclass(v):
+                    v = f'{v.__module__}.{v.__qualname__}'
+
+                    # kernel and ta values can differ by float rounding
+                    kernel = ind.get_kernel(m[k], m.get('ta_func')) if self.use_kernels else None
+                    if kernel:
+                        v = f'{v}|{get_func_fingerprint(kernel)}'
+                elif callable(v):
+                    v = get_func_fingerprint(v)
+
+                items.append(f'{k}={v!r}')
+
+            return f'{name}|{self.prefix}|{self.fillna}|{feature}|{items}'
+
+        attrs = {k: v for k, v in sorted(vars(self).items()) if is_simple(v) and not k in ('df', 'signals')}
+        return f'{name}|{feature}|{attrs}|{get_func_fingerprint(type(self).add_all_signals)}'
+
+    def add_emas(self, df, emas : list, features : set=None, **kw) -> pd.DataFrame:
+        """Add emas group consumes when used standalone, SignalManager adds them once before group instead"""
+        return df.pipe(add_emas, emas=emas, overwrite=False) if features is None else df
+
+    def add_all_signals(self, df, features : set=None, drop : bool=True, **kw):
+        """Convenience base wrapper to work with ta/non-ta signals
+
+        Parameters
+        ----------
+        features : set, optional
+            only assign these features, default all
+        drop : bool, optional
+            drop self.drop_cols, False if SignalManager drops after all groups added, default True
+        """
+        df = df.pipe(self.assign_signals, features=features, **kw)
+
+        if not drop:
+            return df
 
         drop_cols = [col for col in self.drop_cols if col in df.columns]
 
         return df \
             .drop(columns=drop_cols)
     
-    def assign_signals(self, df, params : dict=None) -> pd.DataFrame:
+    def make_feature(self, df, feature_name : str, params : dict=None) -> dict:
+        """Compute single feature (with overridden params) + features in group which consume it, without copying df
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            df with all cols feature consumes
+        feature_name : str
+        params : dict, optional
+            eg {'window': 12}
+
+        Returns
+        -------
+        dict
+            {col: np.ndarray} of recomputed cols, eg mnt_awesome and mnt_awesome_rel
+        """
+        def make(m, x):
+            self.df = x
+            return np.asarray(self.make_signal(**m) if 'cls' in m else m['func'](x))
+
+        def col_name(name):
+            return f'{self.prefix}_{name}' if self.prefix else name
+
+        m = {**self.signals[feature_name], **(params or {})}
+        cols = {col_name(feature_name): make(m, df)}
+
+        # downstream features, signals are in dependency order so only need to check later ones
+        names = list(self.signals)
+        for name in names[names.index(feature_name) + 1:]:
+            requires = self.feature_requires(name)
+
+            if any(col in requires for col in cols):
+                # small df of only cols feature needs
+                x = pd.DataFrame(
+                    {**{c: df[c].to_numpy() for c in requires if c in df.columns}, **cols},
+                    index=df.index)
+
+                cols[col_name(name)] = make(self.signals[name], x)
+
+        self.df = df
+        return cols
+
+    def assign_signals(self, df, params : dict=None, features : set=None) -> pd.DataFrame:
         """loop self.signal_groups, init, call correct func and assign to df column
         
         Parameters
@@ -262,11 +713,16 @@ class SignalGroup():
         params : dict
             if params passed, only reassign those features (for quick optimization testing)
             params must be dict of {feature_name: {single param: value}}
+        features : set, optional
+            only assign these features (in original order), default all
         """
 
         final_signals = {}
         signals = self.signals if params is None else params
 
+        if not features is None:
+            signals = {name: m for name, m in signals.items() if name in features}
+
         for feature_name, m in signals.items():
             
             if not params is None:
@@ -297,17 +753,22 @@ class SignalGroup():
 
         return {name: df[col] for name, col in self.m_default.items()}
 
-    def filter_valid_kws(self, cls, **kw) -> dict:
-        """Check default args of __init__ + merge with extra kws, return dict of valid kws"""
-        signature = inspect.signature(cls.__init__)
+    def filter_valid_kws(self, cls, numpy : bool=False, **kw) -> dict:
+        """Check default args of __init__ (or kernel func) + merge with extra kws, return dict of valid kws"""
+        arg_names = ind.get_arg_names(cls.__init__ if inspect.isclass(cls) else cls)
 
-        # merge extra_kws with default OHLC cols
-        m_all_kw = {**self.default_cols, **(kw or {})}
+        # merge extra_kws with default OHLC cols, only convert cols needed
+        df = self.df
+        if df is None:
+            raise AttributeError('Need to set df first!')
 
-        return {name: col for name, col in m_all_kw.items() if name in signature.parameters.keys()}
+        m_cols = {name: df[col].to_numpy(dtype=float) if numpy else df[col] for name, col in self.m_default.items() if name in arg_names}
+
+        return {name: v for name, v in {**m_cols, **(kw or {})}.items() if name in arg_names}
     
-    def make_signal(self, cls, ta_func : str, **kw):
+    def make_signal(self, cls, ta_func : str, use_kernel : bool=None, **kw):
         """Helper func to init TA signal with correct OHLCV columns
+        - uses NumPy kernel from indicators.py if exists, else init ta obj
         
         Parameters
         ---------
@@ -315,8 +776,15 @@ class SignalGroup():
             class defn of ta indicator to be init
         ta_func : str
             func to call on ta obj to create final signal
+        use_kernel : bool, optional
+            default self.use_kernels
         """
         kw['fillna'] = self.fillna
+        kernel = ind.get_kernel(cls, ta_func)
+
+        if kernel and (self.use_kernels if use_kernel is None else use_kernel):
+            return kernel(**self.filter_valid_kws(cls=kernel, numpy=True, **kw))
+
         good_kw = self.filter_valid_kws(cls=cls, **kw)
 
         return getattr(cls(**good_kw), ta_func)()
@@ -334,6 +802,8 @@ class FeatureInteraction(SignalGroup):
         kw['signals'] = dict()
 
         super().__init__(**kw)
+        requires = cols
+        extra_cols = [int_type]
 
         op = dict(
             sub=np.subtract,
@@ -365,7 +835,7 @@ class Momentum(SignalGroup):
             mnt_tsi=dict(cls=TSIIndicator, ta_func='tsi'),
             mnt_ultimate=dict(cls=UltimateOscillator, ta_func='ultimate_oscillator'),
             mnt_awesome=dict(cls=AwesomeOscillatorIndicator, ta_func='awesome_oscillator', window1=10, window2=50, params=dict(window1=[6, 12, 18], window2=[36, 50, 200])),
-            mnt_awesome_rel=lambda x: x.mnt_awesome / x.ema50
+            mnt_awesome_rel=dict(func=lambda x: x.mnt_awesome / x.ema50, requires=['mnt_awesome', 'ema50'])
             # mnt_kama=dict(cls=KAMAIndicator, ta_func='kama', window=12, pow1=2, pow2=30, row=1)
             )
 
@@ -376,7 +846,7 @@ class Momentum(SignalGroup):
 class Volume(SignalGroup):
     def __init__(self, **kw):
         kw['signals'] = dict(
-            vol_relative=lambda x: x.VolBTC / x.VolBTC.shift(6).rolling(24).mean(),
+            vol_relative=dict(func=lambda x: x.VolBTC / x.VolBTC.shift(6).rolling(24).mean(), requires=['VolBTC']),
             vol_chaik=dict(cls=ChaikinMoneyFlowIndicator, ta_func='chaikin_money_flow'),
             vol_mfi=dict(cls=MFIIndicator, ta_func='money_flow_index', window=14),
             # vol_adi=dict(cls=AccDistIndexIndicator, ta_func='acc_dist_index'),
@@ -388,18 +858,24 @@ class Volume(SignalGroup):
         f.set_self(vars())
    
 class Volatility(SignalGroup):
-    def __init__(self, norm=(0.004, 0.024), **kw):
+    """
+    - norm: (low, high) range to scale vty_ema to as norm_ema (trendrev's order offsets), default None (ulcer only)
+    """
+    def __init__(self, norm=None, **kw):
         kw['signals'] = dict(
             vty_ulcer=dict(cls=UlcerIndex, ta_func='ulcer_index', window=6),
-            # maxhigh=lambda x: x.High.rolling(48).max(),
-            # minlow=lambda x: x.Low.rolling(48).min(),
-            # vty_spread=lambda x: abs(x.maxhigh - x.minlow) / x[['maxhigh', 'minlow']].mean(axis=1),
-            # vty_ema=lambda x: x.vty_spread.ewm(span=60, min_periods=60).mean(),
             # vty_sma=lambda x: x.vty_spread.rolling(300).mean(),
-            # norm_ema=lambda x: np.interp(x.vty_ema, (0, 0.25), (norm[0], norm[1])),
             # norm_sma=lambda x: np.interp(x.vty_sma, (0, 0.25), (norm[0], norm[1])),
         )
 
+        if not norm is None:
+            kw['signals'].update(
+                maxhigh=dict(func=lambda x: x.High.rolling(48).max(), requires=['High']),
+                minlow=dict(func=lambda x: x.Low.rolling(48).min(), requires=['Low']),
+                vty_spread=dict(func=lambda x: abs(x.maxhigh - x.minlow) / x[['maxhigh', 'minlow']].mean(axis=1), requires=['maxhigh', 'minlow']),
+                vty_ema=dict(func=lambda x: x.vty_spread.ewm(span=60, min_periods=60).mean(), requires=['vty_spread']),
+                norm_ema=dict(func=lambda x: np.interp(x.vty_ema, (0, 0.25), (norm[0], norm[1])), requires=['vty_ema']))
+
         super().__init__(**kw)
         drop_cols = ['maxhigh', 'minlow']
         f.set_self(vars())  
@@ -441,17 +917,17 @@ class EMA(SignalGroup):
         c = self.get_c(maxspread=0.1)
 
         kw['signals'] = dict(
-                ema_spread=lambda x: (x[colfast] - x[colslow]) / ((x[colfast] + x[colslow]) / 2),
-                ema_trend=lambda x: np.where(x[colfast] > x[colslow], 1, -1),
-                ema_conf=lambda x: self.ema_exp(x=x.ema_spread, c=c),
-                mhw=lambda x: x.High.rolling(wth).max().shift(offset),
-                mha=lambda x: x.High.rolling(against).max().shift(offset),
-                mhn=lambda x: x.High.rolling(neutral).max().shift(offset),
-                mla=lambda x: x.Low.rolling(wth).min().shift(offset),
-                mlw=lambda x: x.Low.rolling(against).min().shift(offset),
-                mln=lambda x: x.Low.rolling(neutral).min().shift(offset),
-                pxhigh=dict(row=1, func=lambda x: np.where(x.ema_trend == 0, x.mhn, np.where(x.ema_trend == 1, x.mha, x.mhw))),
-                pxlow=dict(row=1, func=lambda x: np.where(x.ema_trend == 0, x.mln, np.where(x.ema_trend == -1, x.mlw, x.mla))),
+                ema_spread=dict(func=lambda x: (x[colfast] - x[colslow]) / ((x[colfast] + x[colslow]) / 2), requires=[colfast, colslow]),
+                ema_trend=dict(func=lambda x: np.where(x[colfast] > x[colslow], 1, -1), requires=[colfast, colslow]),
+                ema_conf=dict(func=lambda x: self.ema_exp(x=x.ema_spread, c=c), requires=['ema_spread']),
+                mhw=dict(func=lambda x: self.m_ext[('High', wth)], requires=['High']),
+                mha=dict(func=lambda x: self.m_ext[('High', against)], requires=['High']),
+                mhn=dict(func=lambda x: self.m_ext[('High', neutral)], requires=['High']),
+                mla=dict(func=lambda x: self.m_ext[('Low', wth)], requires=['Low']),
+                mlw=dict(func=lambda x: self.m_ext[('Low', against)], requires=['Low']),
+                mln=dict(func=lambda x: self.m_ext[('Low', neutral)], requires=['Low']),
+                pxhigh=dict(row=1, func=lambda x: np.where(x.ema_trend == 0, x.mhn, np.where(x.ema_trend == 1, x.mha, x.mhw)), requires=['ema_trend', 'mhn', 'mha', 'mhw']),
+                pxlow=dict(row=1, func=lambda x: np.where(x.ema_trend == 0, x.mln, np.where(x.ema_trend == -1, x.mlw, x.mla)), requires=['ema_trend', 'mln', 'mlw', 'mla']),
         )
 
         super().__init__(**kw)
@@ -459,10 +935,21 @@ class EMA(SignalGroup):
         # trandseries = 'ema_trend'
         f.set_self(vars())
     
-    def add_all_signals(self, df):
+    def reset(self):
+        super().reset()
+        self.m_ext = None
+
+    def add_all_signals(self, df, **kw):
+        # all rolling windows (mhw, mha etc) in one pass
+        self.m_ext = ind.rolling_extrema(
+            high=df.High.to_numpy(),
+            low=df.Low.to_numpy(),
+            windows=[self.wth, self.against, self.neutral],
+            offset=self.offset)
+
         return df \
-            .pipe(add_emas, emas=[self.fast, self.slow]) \
-            .pipe(super().add_all_signals)
+            .pipe(self.add_emas, emas=[self.fast, self.slow], **kw) \
+            .pipe(super().add_all_signals, **kw)
 
     def final(self, side, c):
         temp_conf = abs(c.ema_conf)
@@ -498,9 +985,9 @@ class EMASlope(SignalGroup):
     def __init__(self, p=50, slope=5, **kw):
         ema_col = f'ema{p}'
         kw['signals'] = dict(
-            ema10_slope=lambda x: (x.ema10 - np.roll(x.ema10, slope, axis=0)) / slope,
-            ema50_slope=lambda x: (x.ema50 - np.roll(x.ema50, slope, axis=0)) / slope,
-            ema50_slope_int=lambda x: np.where(np.roll(x[ema_col], slope, axis=0) < x[ema_col], 1, -1)
+            ema10_slope=dict(func=lambda x: (x.ema10 - np.roll(x.ema10, slope, axis=0)) / slope, requires=['ema10']),
+            ema50_slope=dict(func=lambda x: (x.ema50 - np.roll(x.ema50, slope, axis=0)) / slope, requires=['ema50']),
+            ema50_slope_int=dict(func=lambda x: np.where(np.roll(x[ema_col], slope, axis=0) < x[ema_col], 1, -1), requires=[ema_col])
             )
 
         super().__init__(**kw)
@@ -508,27 +995,27 @@ class EMASlope(SignalGroup):
         trendseries = 'ema_slope'
         f.set_self(vars())
     
-    def add_all_signals(self, df):
+    def add_all_signals(self, df, **kw):
         p, slope = self.p, self.slope
 
         return df \
-            .pipe(add_emas, emas=[10, 50]) \
-            .pipe(super().add_all_signals)
+            .pipe(self.add_emas, emas=[10, 50, p], **kw) \
+            .pipe(super().add_all_signals, **kw)
 
         # df.loc[:p + slope, 'ema_slope'] = np.nan
 
     def final(self, side, c):
-        conf = 1.5 if side * c.ema_slope == 1 else 0.5
+        conf = 1.5 if side * c.ema50_slope_int == 1 else 0.5
         return conf * self.weight     
 
 class MACD(SignalGroup):
     def __init__(self, fast=50, slow=200, smooth=50, **kw):
 
         kw['signals'] = dict(
-            macd=lambda x: x[f'ema{fast}'] - x[f'ema{slow}'],
-            macd_signal=lambda x: x.macd.ewm(span=smooth, min_periods=smooth).mean(),
-            macd_diff=lambda x: x.macd - x.macd_signal,
-            macd_trend=lambda x: np.where(x.macd_diff > 0, 1, -1)
+            macd=dict(func=lambda x: x[f'ema{fast}'] - x[f'ema{slow}'], requires=[f'ema{fast}', f'ema{slow}']),
+            macd_signal=dict(func=lambda x: x.macd.ewm(span=smooth, min_periods=smooth).mean(), requires=['macd']),
+            macd_diff=dict(func=lambda x: x.macd - x.macd_signal, requires=['macd', 'macd_signal']),
+            macd_trend=dict(func=lambda x: np.where(x.macd_diff > 0, 1, -1), requires=['macd_diff'])
         )
 
         super().__init__(**kw)
@@ -536,10 +1023,10 @@ class MACD(SignalGroup):
         trendseries = 'macd_trend'
         f.set_self(vars())
     
-    def add_all_signals(self, df):
+    def add_all_signals(self, df, **kw):
         return df \
-            .pipe(add_emas, emas=[self.fast, self.slow]) \
-            .pipe(super().add_all_signals)
+            .pipe(self.add_emas, emas=[self.fast, self.slow], **kw) \
+            .pipe(super().add_all_signals, **kw)
 
     def final(self, side, c):
         conf = 1.25 if side * c.macd_trend == 1 else 0.5
@@ -551,41 +1038,37 @@ class SFP(SignalGroup):
     - This signal needs cdl body signals init first
     - NOTE could maybe use min/max peaks from tsfresh?
     """
+    requires = ['cdl_tail_size_high', 'cdl_tail_size_low', 'cdl_size_full']
+
     def __init__(self, period_base=48, **kw):
         super().__init__(**kw)
         minswing = 0.05 # NOTE could be hyperparam
+        extra_cols = [f'sfp_{extrema}_{period_base * 2 ** i}' for i in range(3) for extrema in ('high', 'low')]
         f.set_self(vars())
 
-    def add_all_signals(self, df):
+    def add_all_signals(self, df, **kw):
 
-        # set min low/max high for each rolling period
+        # set min low/max high for each rolling period, all periods in one pass
         offset = 6
         periods = [self.period_base * 2 ** i for i in range(3)]
+        m_ext = ind.rolling_extrema(high=df.High.to_numpy(), low=df.Low.to_numpy(), windows=periods, offset=offset)
 
-        m = dict(High=['max', 1], Low=['min', -1])
+        m = dict(High=1, Low=-1)
 
         for period in periods:
-            for extrema, v in m.items():
-                agg_func, side = v[0], v[1] 
-                check_extrema = f'{extrema.lower()}_{period}' # high_48
-                
-                s = df[extrema].rolling(period)
-                
-                df[check_extrema] = getattr(s, agg_func)().shift(offset) # min() or max()
-                # df[f'low_{period}'] = df.Low.rolling(period).min().shift(offset)
+            for extrema, side in m.items():
+                check_extrema = m_ext[(extrema, period)] # eg high_48
 
                 # calc candle is swing fail or not
                 # minswing means tail must also be greater than min % of candle full size
-                df[f'sfp_{check_extrema}'] = np.where(
-                    (side * (df[extrema] - df[check_extrema]) > 0) & 
-                    (side * (df.Close - df[check_extrema] < 0)) &
-                    (df[f'cdl_tail_size_{extrema.lower()}'] / df.cdl_size_full > self.minswing),
-                    1, 0)
+                with np.errstate(invalid='ignore'):
+                    df[f'sfp_{extrema.lower()}_{period}'] = np.where(
+                        (side * (df[extrema] - check_extrema) > 0) & 
+                        (side * (df.Close - check_extrema < 0)) &
+                        (df[f'cdl_tail_size_{extrema.lower()}'] / df.cdl_size_full > self.minswing),
+                        1, 0)
 
-        drop_cols = [col for col in df.columns if any(item in col for item in ('high_', 'low_')) and not any(item in col for item in ('sfp', 'prevhigh', 'prevlow'))]
-
-        return df \
-            .drop(columns=drop_cols)
+        return df
 
 class Candle(SignalGroup):
     """
@@ -603,28 +1086,29 @@ class Candle(SignalGroup):
 
         n_periods = 24 # used to cal relative position of close to prev range
         kw['signals'] = dict(
-            cdl_side=lambda x: np.where(x.Close > x.Open, 1, -1),
-            cdl_size_full=lambda x: np.abs(x.High - x.Low) / x.Open,
-            cdl_size_body=lambda x: np.abs(x.Close - x.Open) / x.Open,
-            cdl_tail_size_high=lambda x: np.abs(x.High - x[['Close', 'Open']].max(axis=1)) / x.Open,
-            cdl_tail_size_low=lambda x: np.abs(x.Low - x[['Close', 'Open']].min(axis=1)) / x.Open,
-            ema200_v_high=lambda x: np.abs(x.High - x.ema200) / x.Open,
-            ema200_v_low=lambda x: np.abs(x.Low - x.ema200) / x.Open,
+            cdl_side=dict(func=lambda x: np.where(x.Close > x.Open, 1, -1), requires=['Close', 'Open']),
+            cdl_size_full=dict(func=lambda x: np.abs(x.High - x.Low) / x.Open, requires=['High', 'Low', 'Open']),
+            cdl_size_body=dict(func=lambda x: np.abs(x.Close - x.Open) / x.Open, requires=['Close', 'Open']),
+            cdl_tail_size_high=dict(func=lambda x: np.abs(x.High - x[['Close', 'Open']].max(axis=1)) / x.Open, requires=['High', 'Close', 'Open']),
+            cdl_tail_size_low=dict(func=lambda x: np.abs(x.Low - x[['Close', 'Open']].min(axis=1)) / x.Open, requires=['Low', 'Close', 'Open']),
+            ema200_v_high=dict(func=lambda x: np.abs(x.High - x.ema200) / x.Open, requires=['High', 'ema200', 'Open']),
+            ema200_v_low=dict(func=lambda x: np.abs(x.Low - x.ema200) / x.Open, requires=['Low', 'ema200', 'Open']),
             # ema50_v_close=lambda x: (x.Close - x.ema50) / x.Close,
             # min_n=lambda x: x.Low.rolling(n_periods).min(),
             # range_n=lambda x: (x.High.rolling(n_periods).max() - x.min_n),
             # close_v_range=lambda x: (x.Close - x.min_n) / x.range_n,
-            high_above_prevhigh=lambda x: np.where(x.High > x.pxhigh, 1, 0),
-            close_above_prevhigh=lambda x: np.where(x.Close > x.pxhigh, 1, 0),
-            low_below_prevlow=lambda x: np.where(x.Low < x.pxlow, 1, 0),
-            close_below_prevlow=lambda x: np.where(x.Close < x.pxlow, 1, 0),
-            buy_pressure=lambda x: (x.Close - x.Low.rolling(2).min().shift(1)) / x.Close,
-            sell_pressure=lambda x: (x.Close - x.High.rolling(2).max().shift(1)) / x.Close,
+            high_above_prevhigh=dict(func=lambda x: np.where(x.High > x.pxhigh, 1, 0), requires=['High', 'pxhigh']),
+            close_above_prevhigh=dict(func=lambda x: np.where(x.Close > x.pxhigh, 1, 0), requires=['Close', 'pxhigh']),
+            low_below_prevlow=dict(func=lambda x: np.where(x.Low < x.pxlow, 1, 0), requires=['Low', 'pxlow']),
+            close_below_prevlow=dict(func=lambda x: np.where(x.Close < x.pxlow, 1, 0), requires=['Close', 'pxlow']),
+            buy_pressure=dict(func=lambda x: (x.Close - x.Low.rolling(2).min().shift(1)) / x.Close, requires=['Close', 'Low']),
+            sell_pressure=dict(func=lambda x: (x.Close - x.High.rolling(2).max().shift(1)) / x.Close, requires=['Close', 'High']),
         )
 
 
         super().__init__(**kw)
         drop_cols = ['min_n', 'range_n', 'pxhigh', 'pxlow']
+        extra_cols = ['close_v_range_96']
         f.set_self(vars())
 
     def close_v_range(self, df, n_periods=24):
@@ -635,35 +1119,68 @@ class Candle(SignalGroup):
         df[col] = df[col].fillna(df[col].mean())
         return df
 
-    def add_all_signals(self, df):
+    def add_all_signals(self, df, features : set=None, **kw):
         # NOTE could be kinda wrong div by Open, possibly try div by SMA?
         # TODO NEED candle body sizes relative to current rolling volatility
 
-        return df \
-            .pipe(add_emas) \
-            .pipe(super().add_all_signals) \
-            .pipe(lambda df: df.fillna(value=dict(
+        df = df \
+            .pipe(self.add_emas, emas=[200], features=features) \
+            .pipe(super().add_all_signals, features=features, **kw) \
+            .pipe(lambda df: df.fillna(value={k: v for k, v in dict(
                 buy_pressure=0,
                 sell_pressure=0,
                 # close_v_range=df.close_v_range.mean()
-                ))) \
-            .pipe(self.close_v_range, n_periods=96) \
+                ).items() if k in df.columns}))
             # .pipe(self.close_v_range, n_periods=24) \
             # .pipe(self.close_v_range, n_periods=384) \
 
+        if features is None or 'close_v_range_96' in features:
+            df = df.pipe(self.close_v_range, n_periods=96)
+
+        return df
+
 class CandlePatterns(SignalGroup):
-    def __init__(self, **kw):
+    """TA-Lib candle pattern recognition funcs (CDL*), values are -100/0/100 (some -200/200)
+    - all patterns computed into one preallocated int16 array, then joined to df at once
+    - not atomic, so SignalManager only computes patterns requested as outputs
+    """
+    requires = ['Open', 'High', 'Low', 'Close']
 
-        super().__init__()
+    def __init__(self, patterns : list=None, sparse : bool=False, **kw):
+        """
+        Parameters
+        ----------
+        patterns : list, optional
+            pattern func names to compute, default all TA-Lib pattern recognition funcs
+        sparse : bool, optional
+            store patterns as SparseArray with fill_value=0 (most candles match no pattern), default False
+        """
+        super().__init__(**kw)
+        extra_cols = patterns or tb.get_function_groups()['Pattern Recognition']
+        f.set_self(vars())
 
-    def add_all_signals(self, df):
-        candle_names = tb.get_function_groups()['Pattern Recognition']
+    @property
+    def is_atomic(self) -> bool:
+        return False
 
-        for candle_name in candle_names:
-            df[candle_name] = getattr(tb, candle_name)(df.Open, df.High, df.Low, df.Close)
+    def add_all_signals(self, df, features : set=None, **kw):
+        candle_names = [c for c in self.extra_cols if features is None or c in features]
+        ohlc = [df[col].to_numpy(dtype=float) for col in ('Open', 'High', 'Low', 'Close')]
 
-        return df
-        # return super().add_all_signals(df)
+        data = np.empty((len(df), len(candle_names)), dtype=np.int16)
+        for i, candle_name in enumerate(candle_names):
+            data[:, i] = getattr(tb, candle_name)(*ohlc)
+
+        if self.sparse:
+            df_cdl = pd.DataFrame(
+                {col: pd.arrays.SparseArray(data[:, i], fill_value=0) for i, col in enumerate(candle_names)},
+                index=df.index)
+        else:
+            df_cdl = pd.DataFrame(data, index=df.index, columns=candle_names)
+
+        return df \
+            .drop(columns=[c for c in candle_names if c in df.columns]) \
+            .join(df_cdl)
 
 class TargetClass(SignalGroup):
     """
@@ -682,11 +1199,13 @@ class TargetClass(SignalGroup):
         f.set_self(vars())
 
 class TargetMeanEMA(TargetClass):
+    extra_cols = ['target']
+
     def __init__(self, **kw):
         super().__init__(**kw)
         f.set_self(vars())
     
-    def add_all_signals(self, df):
+    def add_all_signals(self, df, **kw):
         pct_min = self.pct_min # NOTE this could be a hyperparam
         # TODO ^ definitely needs to be scaled to daily volatility
 
@@ -724,16 +1243,332 @@ class TargetMean(TargetClass):
         f.set_self(vars())
 
 
-def add_emas(df, emas : list=None):
+class BaseEMA(SignalGroup):
+    """emaN cols consumed by other groups, added once by SignalManager before any group which needs them"""
+    panel_funcs = True # get_ema uses ema kernel
+    def __init__(self, emas : list, **kw):
+        kw['signals'] = {f'ema{p}': dict(func=lambda x, p=p: get_ema(x.Close, p=p), requires=['Close']) for p in emas}
+        super().__init__(**kw)
+        f.set_self(vars())
+
+def get_func_names(func) -> set:
+    """Return all str names a signal func references (attrs, str constants, str closure vars)
+    - superset of df cols the func reads, eg x.ema50, x['ema_spread'], x[colfast]
+    """
+    func = getattr(func, '__func__', func)
+    if not hasattr(func, '__code__'):
+        return set()
+
+    names = set()
+    codes = [func.__code__]
+    while codes:
+        code = codes.pop()
+        names.update(code.co_names)
+
+        for const in code.co_consts:
+            if isinstance(const, str):
+                names.add(const)
+            elif isinstance(const, tuple):
+                names.update(item for item in const if isinstance(item, str))
+            elif inspect.iscode(const):
+                codes.append(const)
+
+    for cell in func.__closure__ or ():
+        try:
+            val = cell.cell_contents
+        except ValueError:
+            continue # empty cell
+
+        if isinstance(val, str):
+            names.add(val)
+        elif isinstance(val, (list, tuple)):
+            names.update(item for item in val if isinstance(item, str))
+
+    return names
+
+def is_simple(val) -> bool:
+    """Value can be repr'd consistently for cache keys"""
+    if isinstance(val, (list, tuple)):
+        return all(is_simple(item) for item in val)
+
+    return val is None or isinstance(val, (bool, int, float, str, np.number))
+
+def get_func_fingerprint(func) -> str:
+    """Return str of func's bytecode, constants and simple closure values, changes if func or its captured params change"""
+    func = getattr(func, '__func__', func)
+    if not hasattr(func, '__code__'):
+        return repr(func)
+
+    def code_str(code):
+        consts = [code_str(c) if inspect.iscode(c) else repr(c) for c in code.co_consts]
+        return f'{code.co_code.hex()}{code.co_names}{consts}'
+
+    closure = []
+    for cell in func.__closure__ or ():
+        try:
+            val = cell.cell_contents
+        except ValueError:
+            continue
+
+        closure.append(repr(val) if is_simple(val) else type(val).__name__)
+
+    return f'{code_str(func.__code__)}{closure}'
+
+def get_hash(*items) -> str:
+    h = hashlib.blake2b(digest_size=12)
+    for item in items:
+        h.update(item if isinstance(item, bytes) else str(item).encode())
+
+    return h.hexdigest()
+
+class SignalCache():
+    """On-disk cache of computed signal cols, one .npy file per col, loaded lazily with mmap
+    - col key = hash of input OHLCV (index + values), the feature's params/func, and keys of the cols it consumes
+    - changing one feature's params only recomputes that feature and cols downstream of it
+    - cols not used for max_days or beyond max_gb total (least recently used first) are pruned on init
+    """
+    def __init__(self, p=None, max_gb : float=2, max_days : float=30):
+        p = p or f.topfolder / 'data/signal_cache'
+        data_key = None
+        col_keys = {} # {col: key} for current add_signals call
+        f.set_self(vars())
+        self.prune()
+
+    def set_data(self, df):
+        """Hash input OHLCV once per add_signals call"""
+        cols_ohlcv = [col for col in SignalGroup.m_default.values() if col in df.columns]
+
+        self.data_key = get_hash(
+            pd.util.hash_pandas_object(df.index).to_numpy().tobytes(),
+            cols_ohlcv,
+            *[np.ascontiguousarray(df[col].to_numpy()).tobytes() for col in cols_ohlcv])
+
+        self.col_keys = {col: self.data_key for col in cols_ohlcv}
+
+    def input_key(self, df, col) -> str:
+        """Key of col consumed from df which wasn't computed in this add_signals call"""
+        if not col in self.col_keys:
+            self.col_keys[col] = get_hash(col, pd.util.hash_pandas_object(df[col], index=False).to_numpy().tobytes())
+
+        return self.col_keys[col]
+
+    def get_col_key(self, df, signal_group, col, feature) -> str:
+        deps = sorted(c for c in signal_group.feature_requires(feature) if not c == col and (c in self.col_keys or c in df.columns))
+
+        return get_hash(
+            self.data_key,
+            col,
+            signal_group.feature_key(feature),
+            *[self.col_keys.get(c) or self.input_key(df, c) for c in deps])
+
+    def path(self, col, key):
+        return self.p / self.data_key / f'{col}_{key}.npy'
+
+    def load(self, col, key):
+        p = self.path(col, key)
+        if not p.exists():
+            return None
+
+        os.utime(p) # mtime = last used, for prune
+        return np.load(p, mmap_mode='r')
+
+    def save(self, col, key, arr):
+        if arr.dtype == object:
+            return # can't save without pickle, always recompute
+
+        p = self.path(col, key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+
+        # write to tmp file first so a killed kernel can't leave half written col
+        p_tmp = p.with_suffix('.tmp.npy')
+        np.save(p_tmp, arr)
+        os.replace(p_tmp, p)
+
+    def add_all_signals(self, df, signal_group, features : set=None) -> pd.DataFrame:
+        """Load cached cols of signal group, only compute features which aren't cached
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+        signal_group : SignalGroup
+        features : set, optional
+            features needed from group, None if all
+
+        Returns
+        -------
+        pd.DataFrame
+        """
+        # cols in signals order, so cols consumed from same group get their key first
+        keys = {}
+        for col, feature in signal_group.col_features.items():
+            if signal_group.is_atomic or features is None or feature in features:
+                keys[col] = self.get_col_key(df, signal_group, col, feature)
+                self.col_keys[col] = keys[col]
+
+        cached = {col: self.load(col, key) for col, key in keys.items()}
+        missing = [col for col, arr in cached.items() if arr is None]
+
+        # shallow copy so caller's df isn't modified, setting cols keeps mmap arrays (df.copy/assign would copy all data)
+        df = df.copy(deep=False)
+        for col, arr in cached.items():
+            if not arr is None:
+                df[col] = arr
+
+        if missing:
+            # atomic groups always compute all cols
+            features = None if signal_group.is_atomic else {signal_group.col_features[col] for col in missing}
+            df = df.pipe(signal_group.add_all_signals, features=features, drop=False)
+
+            for col in missing:
+                if col in df.columns:
+                    self.save(col, keys[col], df[col].to_numpy())
+
+        return df
+
+    def prune(self, max_gb : float=None, max_days : float=None):
+        """Delete cols not used in last max_days, then least recently used until cache is under max_gb
+
+        Parameters
+        ----------
+        max_gb : float, optional
+            default self.max_gb, None for no size limit
+        max_days : float, optional
+            default self.max_days, None for no age limit
+        """
+        max_gb = self.max_gb if max_gb is None else max_gb
+        max_days = self.max_days if max_days is None else max_days
+
+        if not self.p.exists():
+            return
+
+        files = []
+        for p in self.p.glob('*/*.npy'):
+            try:
+                stat = p.stat()
+                files.append((stat.st_mtime, stat.st_size, p))
+            except FileNotFoundError:
+                pass # removed by other process
+
+        files = sorted(files, reverse=True) # newest first
+        cutoff = time() - max_days * 86400 if not max_days is None else None
+        max_size = max_gb * 2 ** 30 if not max_gb is None else None
+        size = 0
+
+        for mtime, nbytes, p in files:
+            if (not cutoff is None and mtime < cutoff) or (not max_size is None and size + nbytes > max_size):
+                p.unlink(missing_ok=True)
+            else:
+                size += nbytes
+
+        # data_key folders with no cols left
+        for p in self.p.iterdir():
+            if p.is_dir() and not any(p.iterdir()):
+                try:
+                    p.rmdir()
+                except OSError:
+                    pass # col saved by other process since
+
+    def clear(self):
+        """Delete all cached cols"""
+        shutil.rmtree(self.p, ignore_errors=True)
+
+def add_group_signals(df, signal_group, features : set=None, cache=None, new_only : bool=False, **kw):
+    """Add signal group's cols to df, with cache if passed (used by SignalManager.add_signals)
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+    signal_group : SignalGroup
+    features : set, optional
+        features needed from group, None if all
+    cache : SignalCache, optional
+    new_only : bool, optional
+        return only cols group added/recomputed + group and its cache keys, for merging results of parallel workers
+
+    Returns
+    -------
+    pd.DataFrame | tuple
+        df or (df_new, signal_group, col_keys) if new_only
+    """
+    # groups may assign cols to df inplace (eg SFP), workers share df so each needs own frame to write to
+    cols_in = df.columns.to_list()
+    if new_only:
+        df = df.copy(deep=False)
+
+    signal_group.df = df # NOTE kinda sketch
+    if cache is None:
+        df_out = df.pipe(signal_group.add_all_signals, features=features, drop=False, **kw)
+    else:
+        df_out = cache.add_all_signals(df=df, signal_group=signal_group, features=features)
+
+    if not new_only:
+        return df_out
+
+    # new cols + existing cols the group recomputed (eg requested as outputs)
+    computed = {c for c, feature in signal_group.col_features.items() if features is None or feature in features}
+    cols = [c for c in df_out.columns if not c in cols_in or c in computed]
+    col_keys = {c: cache.col_keys[c] for c in cols if c in cache.col_keys} if not cache is None else {}
+
+    return df_out[cols], signal_group, col_keys
+
+def is_panel(df) -> bool:
+    """df has candles for multiple symbols, indexed by (Symbol, Timestamp)"""
+    return isinstance(df.index, pd.MultiIndex) and 'Symbol' in df.index.names
+
+def get_compact_dtype(arr : np.ndarray) -> np.dtype:
+    """Return smallest dtype which holds arr without losing information (except float64 > float32 for continuous values)
+    - integer valued, all finite (eg flags, trend sides, candle patterns of -100/0/100) > int8/int16
+    - anything else > float32
+    """
+    if arr.dtype.kind == 'b' or len(arr) == 0:
+        return arr.dtype
+
+    if arr.dtype.kind in 'iuf':
+        with np.errstate(invalid='ignore'):
+            is_int = arr.dtype.kind in 'iu' or (np.isfinite(arr).all() and (arr == np.round(arr)).all())
+
+        if is_int:
+            vmin, vmax = arr.min(), arr.max()
+            for dtype in (np.int8, np.int16):
+                if np.iinfo(dtype).min <= vmin and vmax <= np.iinfo(dtype).max:
+                    return np.dtype(dtype)
+
+            if arr.dtype.kind in 'iu':
+                return arr.dtype
+
+        return np.dtype(np.float32)
+
+    return arr.dtype
+
+def downcast(df, cols : list=None) -> pd.DataFrame:
+    """Downcast cols to compact dtypes (see get_compact_dtype), default all cols"""
+    df = df.copy(deep=False)
+
+    for col in df.columns if cols is None else cols:
+        if isinstance(df[col].dtype, pd.SparseDtype):
+            continue # already compact, astype would densify
+
+        arr = df[col].to_numpy()
+        dtype = get_compact_dtype(arr)
+
+        if not dtype == arr.dtype:
+            df[col] = arr.astype(dtype)
+
+    return df
+
+def add_emas(df, emas : list=None, overwrite=True):
     """Convenience func to add both 50 and 200 emas"""
     if emas is None:
         emas = [50, 200] # default fast/slow
 
     for p in emas:
-        df = df.pipe(add_ema, p=p)
+        df = df.pipe(add_ema, p=p, overwrite=overwrite)
     
     return df
 
+def get_ema(s : pd.Series, p : int) -> pd.Series:
+    return pd.Series(ind.ema_indicator(s.to_numpy(dtype=float), window=p, fillna=True), index=s.index, name=f'ema_{p}')
+
 def add_ema(df, p, c='Close', col=None, overwrite=True):
     """Add ema from Close price to df if column doesn't already exist (more than one signal may add an ema"""
     if col is None:
@@ -741,7 +1576,7 @@ def add_ema(df, p, c='Close', col=None, overwrite=True):
 
     if not col in df.columns or overwrite:
         # df[col] = df[c].ewm(span=p, min_periods=p).mean()
-        df[col] = EMAIndicator(close=df[c], window=p, fillna=True).ema_indicator()
+        df[col] = get_ema(df[c], p=p)
     
     return df
 
@@ -1,27 +1,36 @@
 import json
 import pickle
 import re
+import shutil
+import tempfile
 import time
+import weakref
+from collections import defaultdict as dd
 from pathlib import Path
 from IPython.core.display import display_pdf
 
 import numpy as np
 import pandas as pd
 from IPython.display import display
+from joblib import Memory, Parallel, cpu_count, delayed
 from matplotlib.colors import LinearSegmentedColormap, ListedColormap # type: ignore
 from seaborn import diverging_palette
+from sklearn.base import clone, is_classifier
 from sklearn.compose import ColumnTransformer
 from sklearn.feature_extraction.text import CountVectorizer, _VectorizerMixin
 from sklearn.feature_selection import SelectKBest
 from sklearn.feature_selection._base import SelectorMixin
-from sklearn.metrics import (accuracy_score, classification_report, f1_score,
-                             make_scorer, recall_score, mean_squared_error)
+from sklearn.metrics import (accuracy_score, check_scoring, classification_report, f1_score,
+                             get_scorer, make_scorer, recall_score, mean_squared_error)
 from sklearn.model_selection import (GridSearchCV, RandomizedSearchCV,
-                                     cross_val_score, cross_validate,
+                                     check_cv, cross_val_score, cross_validate,
                                      train_test_split)
 from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MaxAbsScaler, MinMaxScaler, RobustScaler, StandardScaler
 from sklearn.decomposition import PCA
-from lightgbm import LGBMRegressor
+from sklearn.experimental import enable_halving_search_cv # noqa, required to import halving search
+from sklearn.model_selection import HalvingGridSearchCV, HalvingRandomSearchCV
+from lightgbm import LGBMModel, LGBMRegressor
 from tqdm import tqdm
 
 from icecream import ic
@@ -41,10 +50,19 @@ _cmap = diverging_palette(240, 10, sep=10, n=21, as_cmap=True)
 class ModelManager(object):
     """Manager class to perform cross val etc on multiple models with same underlying column transformer + data
     """
+    min_fold_samples = 100 # min train rows per cv fold in first halving search round
 
-    def __init__(self, ct=None, scoring=None, cv_args=None, random_state=0, target: str = 'target', **kw):
+    def __init__(self, ct=None, scoring=None, cv_args=None, random_state=0, target: str = 'target', memory=None, **kw):
         random_state = random_state
         cv_args = cv_args if not cv_args is None else {}
+
+        # cache fitted ct/pca per (params, fold data), so cross_val/search candidates on same folds reuse them
+        # True for temp dir (deleted by clear_cache, or when manager is garbage collected/at exit), or path/joblib.Memory
+        p_tmp = None
+        if memory is True:
+            p_tmp = tempfile.mkdtemp(prefix='jambot_pipe_')
+            memory = Memory(location=p_tmp, verbose=0)
+
         df_results = pd.DataFrame()
         pipes = {}
         scores = {}
@@ -54,6 +72,10 @@ class ModelManager(object):
         v = {**vars(), **kw}
         set_self(v)
 
+        # finalize holds its own ref to shutil, still works at interpreter shutdown unlike __del__
+        if not p_tmp is None:
+            self._finalizer = weakref.finalize(self, shutil.rmtree, p_tmp, True)
+
         if any(item in kw for item in ('features', 'encoders')):
             self.make_column_transformer(**kw)
 
@@ -99,18 +121,67 @@ class ModelManager(object):
         else:
             return self.models[name]
 
-    def cross_val_feature_params(self, signal_manager, name, model, feature_params: dict, train_size: float = 0.8):
-        """Run full cross val pipe with single replacement of each feature in feature_params"""
+    def cross_val_feature_params(self, signal_manager, name, model, feature_params: dict, train_size: float = 0.8, incremental: bool = True, df=None):
+        """Run full cross val pipe with single replacement of each feature in feature_params
+
+        Parameters
+        ----------
+        signal_manager : SignalManager
+            signal_manager used to build df
+        name : str
+        model : any
+        feature_params : dict
+            eg {'mnt_rsi_2': {'window': [2, 6, 12]}}
+        train_size : float, optional
+            only used if not incremental, default 0.8
+        incremental : bool, optional
+            only recompute varied col(s) and swap into cv fold matrices from existing x_train/y_train
+            (see FeatureSweepCV), else rebuild df, train/test split and full pipe per value, default True
+        df : pd.DataFrame, optional
+            df with all signal cols, default self.df or signal_manager.df
+        """
         df_scores_features = pd.DataFrame()
 
-        for df, param_name in signal_manager \
+        if df is None:
+            df = getattr(self, 'df', None)
+            df = signal_manager.df if df is None else df
+
+        if incremental:
+            sweep = FeatureSweepCV(
+                ct=self.ct,
+                x=self.x_train,
+                y=self.y_train.values.ravel(),
+                cv=self.cv_args.get('cv', 5),
+                scoring=self.cv_args.get('scoring', None),
+                return_train_score=self.cv_args.get('return_train_score', False),
+                classifier=is_classifier(model))
+
+            model.random_state = self.random_state
+            steps = self.make_pipe(name=name, model=model).steps[1:]
+            i_rows = df.index.get_indexer(self.x_train.index)
+
+        for data, param_name in signal_manager \
             .replace_single_feature(
-                df=self.df,
-                feature_params=feature_params):
+                df=df,
+                feature_params=feature_params,
+                incremental=incremental):
+
+            if incremental:
+                cols = {col: vals[i_rows] for col, vals in data.items() if col in self.x_train.columns}
+                scores = sweep.cross_validate(steps=steps, cols=cols)
+
+                df_scores_features = df_scores_features \
+                    .pipe(
+                        append_mean_std_score,
+                        scores=scores,
+                        name=f'{name}_{param_name}',
+                        scoring=self.cv_args.get('scoring', None))
+
+                continue
 
             # need to remake train/test splits every time
             x_train, y_train, x_test, y_test = self.make_train_test(
-                df=df,
+                df=data,
                 target=self.target,
                 train_size=train_size,
                 shuffle=False)
@@ -155,13 +226,24 @@ class ModelManager(object):
         if show:
             self.show()
 
-    def make_pipe(self, name: str, model, steps: list = None):
+    def make_pipe(self, name: str, model, steps: list = None, cache: bool = True):
+        """Make pipe of ct > pca > model
+
+        Parameters
+        ----------
+        name : str
+        model : sklearn model
+        steps : list, optional
+            list of tuples of [(step_pos, (name, model)), ]
+        cache : bool, optional
+            use self.memory to cache fitted transformers, False if every fit sees new data (eg walk-forward), default True
+        """
         pipe = Pipeline(
             steps=[
                 ('ct', self.ct),
                 ('pca', PCA(n_components=10, random_state=self.random_state)),
                 (name, model)],
-            # memory=str(p_tmp)
+            memory=self.memory if cache else None
         )
 
         # insert extra steps in pipe, eg RFECV
@@ -220,6 +302,21 @@ class ModelManager(object):
         if show:
             self.show()
         
+    def clear_cache(self):
+        """Delete cached fitted transformers from disk, and temp dir if memory=True"""
+        if not self.p_tmp is None:
+            shutil.rmtree(self.p_tmp, ignore_errors=True)
+        elif isinstance(self.memory, Memory):
+            self.memory.clear(warn=False)
+
+    def __getstate__(self):
+        # finalize can't be pickled, and unpickled copy shouldn't own (and delete) original's temp dir
+        m = self.__dict__.copy()
+        m.pop('_finalizer', None)
+        m['p_tmp'] = None
+
+        return m
+
     def show(self, df=None):
         if df is None:
             df = self.df_results
@@ -276,10 +373,45 @@ class ModelManager(object):
         """Concat df of predict_proba"""
         return pd.concat([df, self.df_proba(**kw)], axis=1) if do else df
 
-    def add_predict_iter(self, df, name, model, batch_size: int=96, min_size: int=180*24, max_train_size=None, regression=True):
-        """Retrain model every x periods and add predictions for next batch_size"""
-        df_train = df.copy()
+    def add_predict_iter(self, df, name, model, batch_size: int=96, min_size: int=180*24, max_train_size=None, regression=True, warm_start: bool=False, refit_every: int=None, n_estimators_warm: int=10, n_jobs: int=1):
+        """Retrain model every x periods and add predictions for next batch_size
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+        name : str
+            name of model step in pipe
+        model : sklearn model
+        batch_size : int, optional
+            rows predicted per batch, default 96
+        min_size : int, optional
+            rows in first training set, default 180*24
+        max_train_size : int, optional
+            train on sliding window of last max_train_size rows, default None (expanding window)
+        regression : bool, optional
+        warm_start : bool, optional
+            continue boosting LightGBM model from previous batch (n_estimators_warm more trees) between full refits, default False
+        refit_every : int, optional
+            batches between full refits of pipe (ct/pca + model from scratch), other batches reuse fitted ct/pca,
+            default 1 (every batch), or 20 if warm_start
+        n_estimators_warm : int, optional
+            trees added per warm started batch, default 10
+        n_jobs : int, optional
+            fit independent segments (batches from one full refit to the next) in process pool (joblib style, -1 = all cpus), default 1
+
+        Returns
+        -------
+        pd.DataFrame
+        """
+        if warm_start and not isinstance(model, LGBMModel):
+            raise ValueError(f'warm_start only supported for LightGBM models, not {type(model).__name__}')
+
+        if refit_every is None:
+            refit_every = 20 if warm_start else 1
+
         df = df.copy()
+        x, y = split(df, target=self.target)
+        y = y.values.ravel()
 
         df['y_pred'] = np.NaN
         if not regression:
@@ -288,40 +420,48 @@ class ModelManager(object):
         nrows = df.shape[0]
         num_batches = ((nrows - min_size) // batch_size) + 1
 
-        pipe = self.make_pipe(name=name, model=model)
-        
-        # return num_batches
-        for i in tqdm(range(num_batches)):
-
-            i_lower = min_size + i * batch_size
-            i_upper = min(i_lower + batch_size, nrows + 1)
-            idx = df.index[i_lower: i_upper]
-
-            # max number of rows to train on
-            # if max_train_size is None:
-            #     max_train_size = i_lower
-            
-            # train model up to current position
-            x_train, y_train = split(
-                df_train.iloc[0: i_lower],
-                target=self.target)
+        # batches after a full refit depend on it (reused ct/pca, warm started model), segments don't depend on each other
+        i_lowers = [min_size + i * batch_size for i in range(num_batches)]
+        segments = [i_lowers[i:i + refit_every] for i in range(0, num_batches, refit_every)]
 
-            pipe.fit(
-                x_train,
-                y_train.values.ravel(),
-                lgbm__sample_weight=np.linspace(0.5, 1, x_train.shape[0]))
+        pipe = self.make_pipe(name=name, model=model, cache=False)
+        kw = dict(x=x, y=y, name=name, batch_size=batch_size, max_train_size=max_train_size,
+            warm_start=warm_start, n_estimators_warm=n_estimators_warm, regression=regression)
 
-            # add preds to model
-            x_test, _ = split(df_train.loc[idx], target=self.target)
-            y_pred = pipe.predict(x_test)
-            y_true = df.loc[idx, self.target]
+        if n_jobs == 1:
+            results = []
+            for segment in tqdm(segments):
+                results.extend(walk_forward_batches(pipe=pipe, segments=[segment], **kw)[0])
+        else:
+            # one chunk of segments per worker, interleaved so later (bigger) train sets are spread evenly
+            n_workers = cpu_count() + 1 + n_jobs if n_jobs < 0 else n_jobs
+            n_chunks = max(1, min(len(segments), n_workers))
+            chunks = [segments[i::n_chunks] for i in range(n_chunks)]
+
+            # limit model's own threads so workers don't oversubscribe cpus
+            pipe_worker = clone(pipe)
+            model_jobs = {k: v for k, v in model.get_params().items() if k == 'n_jobs'}
+            if model_jobs:
+                pipe_worker.set_params(**{f'{name}__n_jobs': max(1, cpu_count() // n_chunks)})
+
+            # loky memmaps x/y (larger than max_nbytes) once, workers read same file instead of copies
+            out = Parallel(n_jobs=n_chunks, max_nbytes='1M', mmap_mode='r')(
+                delayed(walk_forward_batches)(pipe=clone(pipe_worker), segments=chunk, **kw) for chunk in chunks)
+
+            results = [r for lst, _ in out for r in lst]
+
+            # keep pipe fit on latest segment, same as serial
+            pipe = out[(len(segments) - 1) % n_chunks][1]
+            pipe.set_params(**{f'{name}__{k}': v for k, v in model_jobs.items()})
+            self.pipes[name] = pipe
+
+        # write preds back in walk-forward order
+        for i_lower, y_pred, proba_long in sorted(results, key=lambda r: r[0]):
+            idx = df.index[i_lower: i_lower + len(y_pred)]
+            df.loc[idx, 'y_pred'] = y_pred
 
             if not regression:
-                df.loc[idx, 'proba_long'] = self.df_proba(df=x_test, model=pipe)['proba_long'].values
-
-            # rmse = mean_squared_error(y_true=y_true, y_pred=y_pred, squared=False)
-
-            df.loc[idx, 'y_pred'] = y_pred
+                df.loc[idx, 'proba_long'] = proba_long
 
         df_final = df[[self.target, 'y_pred']].dropna()
         # rmse_final = mean_squared_error(
@@ -346,8 +486,10 @@ class ModelManager(object):
     def best_est(self, name: str):
         return self.grids[name].best_estimator_
 
-    def search(self, name: str, params: dict, estimator=None, search_type: str = 'random', **kw):
+    def search(self, name: str, params: dict, estimator=None, search_type: str = 'random', resource: str = 'n_samples', **kw):
         """Perform Random or Grid search to optimize params on specific model
+        - halving_grid/halving_random run successive halving: all candidates start with small budget (resource),
+        only best 1/factor (default 3) continue to next round with factor x budget
 
         Parameters
         ----------
@@ -358,37 +500,73 @@ class ModelManager(object):
         estimator : sklearn model/Pipeline, optional
             pass in model if not init already, default None
         search_type : str, optional
-            RandomSearchCV or GridSearchCV, default 'random'
+            'random', 'grid', 'halving_random' or 'halving_grid', default 'random'
+        resource : str, optional
+            budget increased each halving round, 'n_samples' (training rows) or model param eg 'n_estimators',
+            if model param is also in params, its min/max are used as min_resources/max_resources, default 'n_samples'
 
         Returns
         -------
-        RandomSearchCV | GridSearchCV
+        RandomSearchCV | GridSearchCV | HalvingRandomSearchCV | HalvingGridSearchCV
             sklearn model_selection object
         """
         # TODO need to enable NO renaming
 
-        # rename params to include 'name__parameter'
-        params = {f'{name}__{k}': v for k, v in params.items()}
+        cv_args = self.cv_args
 
         if estimator is None:
             estimator = self.pipes[name]
 
+        if search_type.startswith('halving'):
+            if resource == 'n_samples':
+                kw.setdefault('min_resources', self.min_samples(estimator=estimator, cv=cv_args.get('cv')))
+
+            if resource in params:
+                # budget range from grid, eg n_estimators=[25, 50, 100] > 25 to 100
+                values = params[resource]
+                params = {k: v for k, v in params.items() if not k == resource}
+                kw.setdefault('min_resources', min(values))
+                kw.setdefault('max_resources', max(values))
+
+            kw['resource'] = resource if resource == 'n_samples' else f'{name}__{resource}'
+
+            # halving only ranks candidates by one metric, use refit metric
+            scoring = cv_args.get('scoring', None)
+            if isinstance(scoring, dict):
+                refit = kw.pop('refit', None)
+                if not refit in scoring:
+                    raise ValueError(f'Must pass refit=metric name for halving search with multiple scoring metrics: {list(scoring)}')
+
+                cv_args = {**cv_args, 'scoring': scoring[refit]}
+
+        # rename params to include 'name__parameter'
+        params = {f'{name}__{k}': v for k, v in params.items()}
+
         m = dict(
             random=dict(
                 cls=RandomizedSearchCV,
                 param_name='param_distributions'),
             grid=dict(
                 cls=GridSearchCV,
+                param_name='param_grid'),
+            halving_random=dict(
+                cls=HalvingRandomSearchCV,
+                param_name='param_distributions'),
+            halving_grid=dict(
+                cls=HalvingGridSearchCV,
                 param_name='param_grid')) \
             .get(search_type)
 
+        if m is None:
+            raise ValueError(f'Invalid search_type: {search_type}')
+
         # grid/random have different kw for param grid/distribution
         kw[m['param_name']] = params
 
         grid = m['cls'](
             estimator=estimator,
             **kw,
-            **self.cv_args) \
+            **cv_args) \
             .fit(self.x_train, self.y_train.values.ravel())
 
         self.grids[name] = grid
@@ -401,6 +579,32 @@ class ModelManager(object):
 
         return grid
 
+    def min_samples(self, estimator, cv=None) -> int:
+        """Return min rows for halving search's first round, so every cv train fold can fit estimator
+        - halving default min_resources='smallest' starts with ~2 rows per split, pipe's PCA can't fit on every fold
+        - TimeSeriesSplit's first train fold is ~1/(n_splits + 1) of rows, so floor per fold x (n_splits + 1)
+
+        Parameters
+        ----------
+        estimator : Pipeline | sklearn model
+        cv : int | cv splitter, optional
+            default self.cv_args cv
+
+        Returns
+        -------
+        int
+            capped at rows in x_train
+        """
+        if cv is None:
+            cv = self.cv_args.get('cv')
+
+        n_splits = check_cv(cv).get_n_splits()
+        steps = estimator.steps if isinstance(estimator, Pipeline) else [(None, estimator)]
+        n_components = [step.n_components for _, step in steps if isinstance(step, PCA) and isinstance(step.n_components, int)]
+        min_fold = max([self.min_fold_samples] + n_components)
+
+        return min(min_fold * (n_splits + 1), len(self.x_train))
+
     def save_model(self, name: str, **kw):
         model = self.get_model(name=name, **kw)
 
@@ -413,6 +617,31 @@ class ModelManager(object):
         with open(filename, 'rb') as file:
             return pickle.load(file)
 
+    def register_model(self, name: str, registry, metrics: dict = None, best_est=False, **kw):
+        """Save fitted pipe as new version in model registry (see jambot.registry.ModelRegistry)
+
+        Parameters
+        ----------
+        name : str
+        registry : ModelRegistry
+        metrics : dict, optional
+            default mean test scores from last cross_val of model
+        best_est : bool, optional
+            save best estimator of last search instead of self.pipes[name], default False
+        kw :
+            extra meta to save
+
+        Returns
+        -------
+        RegisteredModel
+        """
+        pipe = self.best_est(name) if best_est else self.pipes[name]
+
+        if metrics is None:
+            metrics = {k: np.mean(v) for k, v in self.scores.get(name, {}).items() if k.startswith('test_')}
+
+        return registry.save(name=name, pipe=pipe, x_train=self.x_train, target=self.target, metrics=metrics, **kw)
+
     def make_train_test(self, df, target, train_size=0.8, **kw):
         """Make x_train, y_train etc from df
 
@@ -443,6 +672,163 @@ class ModelManager(object):
             model=self.models[name],
             **kw)
 
+class FeatureSweepCV(object):
+    """Cross validate steps after a ColumnTransformer many times, where only one or a few input cols change between runs
+    - ct is fit once per fold, transformed fold train/val matrices are kept (preallocated once)
+    - swapping a col only refits that col's encoder and writes it into the matrices in place, other cols reuse fitted transforms
+    - only per column encoders (eg MinMaxScaler, passthrough) can be swapped in place, other cols refit full ct for that run
+    - steps after ct (eg PCA, model) are refit every run
+    """
+    per_col_encoders = (MinMaxScaler, StandardScaler, MaxAbsScaler, RobustScaler)
+
+    def __init__(self, ct, x: pd.DataFrame, y: np.ndarray, cv=5, scoring=None, return_train_score=False, classifier=False):
+        cv = check_cv(cv, y, classifier=classifier)
+        folds = []
+
+        for idx_train, idx_val in cv.split(x, y):
+            ct_fold = clone(ct).fit(x.iloc[idx_train], y[idx_train])
+
+            folds.append(dict(
+                idx_train=idx_train,
+                idx_val=idx_val,
+                ct=ct_fold,
+                x_train=to_dense(ct_fold.transform(x.iloc[idx_train])),
+                x_val=to_dense(ct_fold.transform(x.iloc[idx_val]))))
+
+        col_map = self.get_col_map(ct=folds[0]['ct'], cols=x.columns)
+        set_self(vars())
+
+    def get_col_map(self, ct, cols) -> dict:
+        """Return {col: (transformer name, output col idx)} for cols transformed 1:1 by per column encoders"""
+        col_map, i = {}, 0
+
+        for name, encoder, features in ct.transformers_:
+            if isinstance(encoder, str) and encoder == 'drop':
+                continue
+
+            # single str col (eg CountVectorizer) has unknown output width, so following cols can't be mapped
+            if isinstance(features, str):
+                break
+
+            if len(features) == 0:
+                continue
+
+            if name == 'remainder':
+                features = [cols[c] if isinstance(c, (int, np.integer)) else c for c in features]
+
+            if not (isinstance(encoder, str) or isinstance(encoder, self.per_col_encoders)):
+                break
+
+            for col in features:
+                col_map[col] = (name, i)
+                i += 1
+
+        return col_map
+
+    def get_scorers(self, estimator) -> dict:
+        scoring = self.scoring
+        if scoring is None or isinstance(scoring, str) or callable(scoring):
+            return dict(score=check_scoring(estimator, scoring=scoring))
+
+        if isinstance(scoring, (list, tuple)):
+            scoring = {name: name for name in scoring}
+
+        return {name: get_scorer(scorer) if isinstance(scorer, str) else scorer for name, scorer in scoring.items()}
+
+    def swap_cols(self, fold: dict, cols: dict) -> dict:
+        """Write transformed cols into fold matrices in place, return previous values to restore
+
+        Returns
+        -------
+        dict
+            {output col idx: (train values, val values)}, None if col couldn't be swapped in place
+        """
+        idx_train, idx_val = fold['idx_train'], fold['idx_val']
+        prev = {}
+
+        if any(not col in self.col_map for col in cols):
+            return None
+
+        for col, vals in cols.items():
+            name, i = self.col_map[col]
+            encoder = fold['ct'].named_transformers_[name]
+            vals = np.asarray(vals, dtype=float)
+            v_train, v_val = vals[idx_train], vals[idx_val]
+
+            if not isinstance(encoder, str):
+                encoder = clone(encoder).fit(v_train.reshape(-1, 1))
+                v_train = encoder.transform(v_train.reshape(-1, 1))[:, 0]
+                v_val = encoder.transform(v_val.reshape(-1, 1))[:, 0]
+
+            prev[i] = (fold['x_train'][:, i].copy(), fold['x_val'][:, i].copy())
+            fold['x_train'][:, i] = v_train
+            fold['x_val'][:, i] = v_val
+
+        return prev
+
+    def cross_validate(self, steps: list, cols: dict = None) -> dict:
+        """Fit/score clone of steps on each fold with cols replaced, same output format as sklearn cross_validate
+
+        Parameters
+        ----------
+        steps : list
+            pipeline steps after ct, eg [('pca', PCA()), ('lgbm', model)]
+        cols : dict, optional
+            {col: values aligned to x rows}
+
+        Returns
+        -------
+        dict
+            fit_time, score_time, test_{scorer}, (train_{scorer})
+        """
+        cols = cols or {}
+        scores = dd(list)
+
+        for fold in self.folds:
+            y_train, y_val = self.y[fold['idx_train']], self.y[fold['idx_val']]
+            prev = self.swap_cols(fold=fold, cols=cols)
+
+            if prev is None:
+                # col not transformed 1:1, refit full ct for this run
+                x = self.x.assign(**cols)
+                ct = clone(self.ct).fit(x.iloc[fold['idx_train']], y_train)
+                x_train = to_dense(ct.transform(x.iloc[fold['idx_train']]))
+                x_val = to_dense(ct.transform(x.iloc[fold['idx_val']]))
+            else:
+                x_train, x_val = fold['x_train'], fold['x_val']
+
+            try:
+                pipe = Pipeline(steps=[(name, clone(step)) for name, step in steps])
+
+                t = time.time()
+                pipe.fit(x_train, y_train)
+                scores['fit_time'].append(time.time() - t)
+
+                t = time.time()
+                for name, scorer in self.get_scorers(pipe).items():
+                    scores[f'test_{name}'].append(scorer(pipe, x_val, y_val))
+
+                    if self.return_train_score:
+                        scores[f'train_{name}'].append(scorer(pipe, x_train, y_train))
+
+                scores['score_time'].append(time.time() - t)
+            finally:
+                # restore original cols so next run starts from base matrices
+                for i, (v_train, v_val) in (prev or {}).items():
+                    fold['x_train'][:, i] = v_train
+                    fold['x_val'][:, i] = v_val
+
+        return {k: np.array(v) for k, v in scores.items()}
+
+
+def to_dense(data) -> np.ndarray:
+    """Convert ColumnTransformer output to writeable float array"""
+    if hasattr(data, 'toarray'):
+        data = data.toarray()
+
+    return np.array(data, dtype=float)
+
+
 def shap_explainer_values(X, y, ct, model, n_sample=2000):
     """Create shap values/explainer to be used with summary or force plot"""
     data = ct.fit_transform(X)
@@ -498,6 +884,69 @@ def split(df, target):
     return df.drop(columns=target), df[target]
 
 
+def walk_forward_batches(pipe, x, y, segments: list, name: str, batch_size: int, max_train_size=None, warm_start=False, n_estimators_warm=10, regression=True) -> tuple:
+    """Fit pipe on rows before each batch then predict batch, for each walk-forward segment (see ModelManager.add_predict_iter)
+    - first batch of segment fully refits pipe, following batches reuse fitted ct/pca and refit (or warm start) model only
+
+    Parameters
+    ----------
+    pipe : Pipeline
+    x : pd.DataFrame
+    y : np.ndarray
+    segments : list
+        list of [i_lower, ...] of batches, first row of each batch
+
+    Returns
+    -------
+    tuple
+        ([(i_lower, y_pred, proba_long)], fitted pipe), proba_long is None if regression
+    """
+    est = pipe.steps[-1][1]
+    n_estimators = est.get_params().get('n_estimators')
+    results = []
+
+    for segment in segments:
+        for i, i_lower in enumerate(segment):
+            x_test = x.iloc[i_lower: i_lower + batch_size]
+            if len(x_test) == 0:
+                continue
+
+            # max number of rows to train on
+            i_start = 0 if max_train_size is None else max(0, i_lower - max_train_size)
+
+            # train model up to current position
+            x_train, y_train = x.iloc[i_start: i_lower], y[i_start: i_lower]
+            sample_weight = np.linspace(0.5, 1, x_train.shape[0])
+
+            if i == 0:
+                # full refit, ct/pca + model from scratch
+                if warm_start:
+                    est.set_params(n_estimators=n_estimators)
+
+                pipe.fit(x_train, y_train, **{f'{name}__sample_weight': sample_weight})
+            else:
+                # keep ct/pca fitted at last full refit, so model sees same features
+                x_train = pipe[:-1].transform(x_train)
+
+                if warm_start:
+                    est.set_params(n_estimators=n_estimators_warm)
+                    est.fit(x_train, y_train, sample_weight=sample_weight, init_model=est.booster_)
+                else:
+                    est.fit(x_train, y_train, sample_weight=sample_weight)
+
+            proba_long = None
+            if not regression:
+                proba_long = pipe.predict_proba(x_test)[:, list(pipe.classes_).index(1)]
+
+            results.append((i_lower, pipe.predict(x_test), proba_long))
+
+    # restore so pipe's model params match what was passed in
+    if warm_start:
+        est.set_params(n_estimators=n_estimators)
+
+    return results, pipe
+
+
 def format_cell(bg, t='black'):
     return f'background-color: {bg};color: {t};'
 
@@ -1,3 +1,6 @@
+import numpy as np
+import pandas as pd
+
 from .. import (
     backtest as bt,
     signals as sg,
@@ -10,6 +13,7 @@ class Strategy(Strategy):
 
         use_stops = True if not stoppercent is None else False
         split_val = 0 if regression else 0.5
+        df_trades = None # only set by decide_vectorized
 
         f.set_self(vars())
 
@@ -77,6 +81,71 @@ class Strategy(Strategy):
         # close final trade at last candle to see pnl
         if c.Index == df.index[-1]:
             self.exit_trade(exit_price=cur_price)
+
+    def decide_vectorized(self):
+        """Run full backtest from vectorized trade arrays instead of candle by candle decide
+        - only loops once per trade to compound account balance with same int contracts as Order/Trade
+        - sets df_trades, which is returned by result()
+        """
+        df, sym, a = self.df, self.sym, self.a
+        idx = df.index
+
+        m = get_trade_arrays(
+            side=np.where(df.rolling_proba.to_numpy() > self.split_val, 1, -1),
+            high=df.High.to_numpy(),
+            low=df.Low.to_numpy(),
+            close=df.Close.to_numpy(),
+            i_start=sym.startrow,
+            stoppercent=self.stoppercent if self.use_stops else None,
+            slippage=self.slippage,
+            decimalfigs=sym.decimalfigs)
+
+        data = []
+        for tradenum, (i_enter, i_exit, i_fill, side, entryprice, exitprice) in enumerate(zip(
+                m['i_enter'], m['i_exit'], m['i_fill'], m['side'], m['entryprice'], m['exitprice'])):
+
+            entrybalance = a.get_balance()
+            targetcontracts = int(f.get_contracts(entrybalance, self.lev, entryprice, side, sym.altstatus) * self.weight)
+            contracts = int(targetcontracts * 1) # conf is always 1
+
+            if contracts == 0:
+                # orders with 0 contracts never set entry/exit price
+                entryprice, exitprice = 0, 0
+            else:
+                a.modify(
+                    xbt=f.get_pnl_xbt(contracts, entryprice, exitprice, sym.altstatus),
+                    timestamp=idx[i_fill])
+
+            exitbalance = a.get_balance()
+
+            data.append([
+                tradenum,
+                idx[i_enter],
+                side,
+                i_exit - i_enter + 1,
+                entryprice,
+                exitprice,
+                0, # ml trades never set filledcontracts
+                1,
+                f.get_pnl(side, entryprice, exitprice),
+                (exitbalance - entrybalance) / entrybalance if not exitbalance == 0 else 0,
+                exitbalance])
+
+        self.df_trades = pd.DataFrame.from_records(data=data, columns=self.result_cols) \
+            .assign(profitable=lambda x: x.Pnl > 0)
+
+    def tradecount(self):
+        return super().tradecount() if self.df_trades is None else len(self.df_trades)
+
+    def good_trades(self):
+        return super().good_trades() if self.df_trades is None else int(self.df_trades.profitable.sum())
+
+    def result(self, first=float('inf'), last=0):
+        df = self.df_trades
+        if df is None:
+            return super().result(first=first, last=last)
+
+        return df.iloc[last * -1: min(first, len(df))].reset_index(drop=True)
     
 class Trade(Trade):
     def __init__(self):
@@ -151,4 +220,73 @@ class Trade(Trade):
                     # NOTE not sure if this should be here
                     self.stopped = True
                     self.pnlfinal = f.get_pnl(self.side, self.entryprice, self.exitprice)
-                    self.exitbalance = self.sym.account.get_balance()
\ No newline at end of file
+                    self.exitbalance = self.sym.account.get_balance()
+
+def get_trade_arrays(side, high, low, close, i_start=0, stoppercent=None, slippage=0, decimalfigs=0) -> dict:
+    """Vectorized trade entries/exits for strategy which flips side every time signal side changes
+    - matches ml.Strategy.decide, eg stop checked on entry candle and exit candle, exit at Close of flip candle
+    - can be used directly to score many prediction variants without a Backtest
+
+    Parameters
+    ----------
+    side : np.ndarray
+        target side (1 or -1) for every candle
+    high, low, close : np.ndarray
+    i_start : int, optional
+        first candle to trade, default 0
+    stoppercent : float, optional
+        eg -0.03, default None (no stops)
+    slippage : float, optional
+        slippage applied to stop fill price, default 0
+    decimalfigs : int, optional
+        symbol price decimals, used to round stop price same as Order.final_price
+
+    Returns
+    -------
+    dict
+        arrays of i_enter, i_exit, i_fill (candle exit was filled), side, entryprice, exitprice, stopped
+    """
+    n = len(close)
+    s = side[i_start:]
+
+    # new trade on first candle, then every candle where side flips, last trade closed on final candle
+    i_enter = np.flatnonzero(np.r_[True, s[1:] != s[:-1]]) + i_start
+    i_exit = np.r_[i_enter[1:], n - 1]
+    trade_side = side[i_enter]
+    entryprice = close[i_enter]
+    exitprice = close[i_exit].astype(float)
+    i_stop = np.full(len(i_enter), -1)
+
+    if not stoppercent is None:
+        # f.get_price, then Order.final_price rounding (stop side is opposite trade side)
+        stoppx = np.where(trade_side == 1, stoppercent * entryprice + entryprice, entryprice / (1 + stoppercent))
+        stoppx = np.round(np.round(stoppx, decimalfigs) + float(f'1e-{decimalfigs}') * trade_side, decimalfigs)
+
+        def is_hit(k, j):
+            return np.where(trade_side[j] == 1, low[k] <= stoppx[j], high[k] >= stoppx[j])
+
+        # first candle each trade's stop is hit, candles are mapped to most recently entered trade
+        k = np.arange(i_start, n)
+        tid = np.searchsorted(i_enter, k, side='right') - 1
+        hit = is_hit(k, tid)
+        tid_hit, i_first = np.unique(tid[hit], return_index=True)
+        i_stop[tid_hit] = k[hit][i_first]
+
+        # exit candle is also next trade's entry candle, check it with exiting trade's stop
+        j = np.flatnonzero(i_stop[:-1] < 0)
+        hit = is_hit(i_exit[j], j)
+        i_stop[j[hit]] = i_exit[j[hit]]
+
+        stopped = i_stop >= 0
+        exitprice = np.where(stopped, stoppx * (1 - slippage * trade_side), exitprice)
+    else:
+        stopped = np.zeros(len(i_enter), dtype=bool)
+
+    return dict(
+        i_enter=i_enter,
+        i_exit=i_exit,
+        i_fill=np.where(stopped, i_stop, i_exit),
+        side=trade_side,
+        entryprice=entryprice,
+        exitprice=exitprice,
+        stopped=stopped)
@@ -1,6 +1,7 @@
 from .. import (
     backtest as bt,
     signals as sg,
+    indicators as ind,
     functions as f)
 from ..backtest import Order, Candle
 
@@ -23,17 +24,18 @@ class Strategy(bt.Strategy):
 
         offset = 6
         period_base = 48 #48, 96, 192
+        periods = [period_base * 2 ** i for i in range(3)]
+        m_ext = ind.rolling_extrema(high=df.High.to_numpy(), low=df.Low.to_numpy(), windows=periods, offset=offset)
 
-        for i in range(3):
-            period = period_base * 2 ** i
+        for i, period in enumerate(periods):
+            df[f'sfp_high{i}'] = m_ext[('High', period)]
+            df[f'sfp_low{i}'] = m_ext[('Low', period)]
 
-            df[f'sfp_high{i}'] = df.High.rolling(period).max().shift(offset)
-            df[f'sfp_low{i}'] = df.Low.rolling(period).min().shift(offset)
-
-        ema = sg.EMA(weight=1)
-        df = df.pipe(ema.add_signal)
+        df = sg.SignalManager().add_signals(df=df, signals=[sg.EMA(weight=1)])
         self.df = df
-        # self.sym.df = df
+
+        if not sym is None:
+            self.sym.df = df
         
     def check_tail(self, side, cdl):
         return True if cdl.tailsize(side=side) / cdl.size() > self.minswing else False
@@ -66,11 +68,8 @@ class Strategy(bt.Strategy):
 
             for i in range(3):
                 swing = f'{k}{i}'
-                # TODO: this is sketch
-                if 'pandas.core.frame.Pandas' in str(type(c)):
-                    swingval = c._asdict()[f'sfp_{swing}']
-                else:
-                    swingval = c[f'sfp_{swing}']
+                # works for df row Series or backtest CandleCursor
+                swingval = c[f'sfp_{swing}']
 
                 if (side * (swingval - prevmax) > 0 and
                     self.check_swing(side=side, swingval=swingval, cdl=cdl) and
@@ -150,4 +149,4 @@ class Trade(bt.Trade):
                     name='marketclose',
                     trade=self)
 
-        self.marketopen.fill(c=self.cdl)
+        self.marketopen.fill(c=self.cdl, price=self.entrytarget)
@@ -13,17 +13,21 @@ class Strategy(bt.Strategy):
         self.lasthigh, self.lastlow = 0, 0
         self.emaspeed = emaspeed
 
+    def get_signals(self) -> dict:
+        """Return signal groups trend needs in sym.df, EMA adds pxhigh/pxlow for self.speed"""
+        fast, slow = self.emaspeed[0], self.emaspeed[1]
+        return dict(
+            macd=sg.MACD(weight=1, fast=fast, slow=slow),
+            ema=sg.EMA(weight=1, fast=fast, slow=slow, speed=self.speed))
+
     def init(self, sym):
         self.sym = sym
-        df = sym.df
-        fast, slow = self.emaspeed[0], self.emaspeed[1]
-            
-        macd = sg.MACD(df=sym.df, weight=1, fast=fast, slow=slow)
-        ema = sg.EMA(df=sym.df, weight=1, fast=fast, slow=slow)
-        # emaslope = EMASlope(df=df, weight=1, p=50, slope=5)
-        self.conf.add_signal([macd, ema])
-        
-        self.trend = sg.Trend(df=df, signals=[df.ema_trend], speed=self.speed)
+        m = self.get_signals()
+        self.conf.add_signal(signals=[m['macd'], m['ema']])
+
+        df = sg.SignalManager().add_signals(df=sym.df, signals=list(m.values()))
+        self.df = df
+        self.sym.df = df
 
     def get_recent_win_conf(self):
         # TODO: could probs do this better with list/filter
@@ -87,7 +91,7 @@ class Strategy(bt.Strategy):
         lstOrders = []
         c = self.sym.cdl
         side = self.get_side()
-        price = c.trend_low if self.status == 1 else c.trend_high
+        price = c.pxlow if self.status == 1 else c.pxhigh
         
         #TODO: use trade's orders now
         # stopclose
@@ -10,16 +10,10 @@ class Strategy(trend.Strategy):
         super().__init__(speed=speed, emaspeed=emaspeed)
         self.name = 'trendopen'
 
-    def init(self, sym):
-        self.sym = sym
-        df = sym.df
-        fast, slow = self.emaspeed[0], self.emaspeed[1]
-            
-        macd = sg.MACD(df=sym.df, weight=1, fast=fast, slow=slow)
-        ema = sg.EMA(df=sym.df, weight=1, fast=fast, slow=slow)
-        self.conf.add_signal([macd, ema])
-        
-        self.trend = sg.Trend(df=df, offset=6, signals=[df.ema_trend], speed=self.speed)
+    def get_signals(self) -> dict:
+        m = super().get_signals()
+        m['ema'] = sg.EMA(weight=1, fast=self.emaspeed[0], slow=self.emaspeed[1], speed=self.speed, offset=6)
+        return m
 
     def enter_trade(self, side, c):
         self.trade = self.init_trade(trade=Trade(), side=side, entryprice=c.Close, conf=self.get_confidence(side=side))
@@ -91,5 +85,5 @@ class Trade(bt.Trade):
                     execinst='Close',
                     trade=self)
         
-        self.marketopen.fill(c=self.cdl)
+        self.marketopen.fill(c=self.cdl, price=self.entrytarget)
         
@@ -1,6 +1,9 @@
+import numpy as np
+
 from .. import (
     backtest as bt,
     signals as sg,
+    streaming,
     functions as f)
 from ..backtest import Order, Strategy, Trade
 
@@ -14,28 +17,49 @@ class Strategy(Strategy):
         self.lasthigh, self.lastlow = 0, 0
         self.timeout = 40
         self.slippage = 0
+        self.presignaled = False # signal cols already in sym.df, eg from optimization.run_sweep
+        self.skip_quiet = True # jump over candles where no trade can enter/exit/fill
+        self._cols = None
+
+    def get_signals(self) -> dict:
+        """Return signal groups trendrev needs in sym.df, same groups used by optimization.run_sweep"""
+        return dict(
+            vty=sg.Volatility(weight=1, norm=self.norm),
+            macd=sg.MACD(weight=1),
+            ema=sg.EMA(weight=1, speed=self.speed),
+            emaslope=sg.EMASlope(weight=1, p=50, slope=5),
+            trend=sg.Trend())
 
     def init(self, sym):
         self.sym = sym
         df = sym.df
         self.a = self.sym.account
-        
-        self.vty = sg.Volatility(weight=1, norm=self.norm)
-        df = df.pipe(self.vty.add_signal)
 
-        macd = sg.MACD(weight=1)
-        ema = sg.EMA(weight=1)
-        emaslope = sg.EMASlope(weight=1, p=50, slope=5)
-        df = self.conf.add_signal(df=df, signals=[macd, ema, emaslope],
-                            trendsignals=[ema])
+        m = self.get_signals()
+        self.vty = m['vty']
+        self.trend = m['trend'] # not used in conf
+        self.conf.add_signal(signals=[m['macd'], m['ema'], m['emaslope']], trendsignals=[m['ema']])
 
-        # NOTE kinda sketch for now, manually adding signals this way to avoid adding to 'conf' signal
-        self.trend = sg.Trend(signal_series='ema_trend', speed=self.speed)
-        df = df.pipe(self.trend.add_signal)
+        if not self.presignaled:
+            df = sg.SignalManager().add_signals(df=df, signals=list(m.values()))
 
         self.df = df
         self.sym.df = df
 
+    def make_stream(self):
+        """Return streaming signals for live candles, same cols as init's batch signals
+        - Trend has no streaming version, its ta cols are recomputed in batch over each new window
+        - see streaming.SignalStream for how streamed values differ from a batch recompute once window slides
+        """
+        m = self.get_signals()
+        return streaming.SignalStream(
+            streams=[
+                streaming.VolatilityStream(norm=self.norm),
+                streaming.MACDStream(),
+                streaming.EMAStream(speed=self.speed),
+                streaming.EMASlopeStream(p=m['emaslope'].p, slope=m['emaslope'].slope)],
+            batch_signals=[m['trend']])
+
     def exit_trade(self):
         t = self.trade
         c = self.cdl
@@ -90,6 +114,70 @@ class Strategy(Strategy):
 
         self.lasthigh, self.lastlow = pxhigh, pxlow
 
+    def init_event_arrays(self, cols):
+        """Price arrays (aligned to candles) which trigger enter/exit, NaN always counts as event
+        - entry/exit compare to previous candle's pxhigh/pxlow
+        - limitclose price is set from previous candle, widened by one price tick to cover rounding
+        """
+        self._cols = cols
+        pxhigh, pxlow, norm_ema = cols['pxhigh'], cols['pxlow'], cols['norm_ema']
+        prevhigh, prevlow = np.r_[np.nan, pxhigh[:-1]], np.r_[np.nan, pxlow[:-1]]
+        tick = float('1e-{}'.format(self.sym.decimalfigs))
+
+        def fill(arr, above):
+            return np.nan_to_num(arr, nan=-np.inf if above else np.inf)
+
+        self.ev_enter = dict(above=fill(prevhigh, True), below=fill(prevlow, False))
+        self.ev_exit = {
+            1: dict(above=fill(np.maximum(pxhigh, prevhigh), True)),
+            -1: dict(below=fill(np.minimum(pxlow, prevlow), False))}
+
+        prevnorm = np.r_[np.nan, norm_ema[:-1]]
+        self.ev_limitclose = {
+            1: dict(above=fill(prevhigh * (1 + prevnorm) - tick, True)),
+            -1: dict(below=fill(prevlow * (1 - prevnorm) + tick, False))}
+
+    def next_event(self, i, i_end):
+        if not self.skip_quiet:
+            return i + 1
+
+        cdl = self.sym.cursor
+        if not cdl.cols is self._cols:
+            self.init_event_arrays(cdl.cols)
+
+        t = self.trade
+        if t is None:
+            return max(cdl.next_cross(i + 1, i_end, **self.ev_enter), i + 1)
+
+        i_next = cdl.next_cross(i + 1, i_end, **self.ev_exit[t.side])
+
+        # limitopen market fills at duration 4
+        if not t.limitopen.filled:
+            i_next = min(i_next, max(t.i_first + 3, i + 1))
+
+        i_next = t.next_event(i=i, i_end=i_next, orders=[t.limitopen, t.stop])
+
+        if t.limitclose.active and not t.limitclose.filled:
+            if t.limitclose.delaytime > cdl.at(i).Index:
+                return i + 1
+
+            i_next = cdl.next_cross(i + 1, i_next, **self.ev_limitclose[t.side])
+
+        return i_next
+
+    def skip(self, i, i_next):
+        # quiet candles only add to trade duration and move limitclose/last high/low
+        c = self.sym.cursor.at(i_next - 1)
+        self.cdl = c
+        self.i = c.Index
+
+        t = self.trade
+        if not t is None:
+            t.skip_candles(cdl=c, n=i_next - 1 - i)
+            t.limitclose.set_price(price=t.closeprice())
+
+        self.lasthigh, self.lastlow = c.pxhigh, c.pxlow
+
     def final_orders(self, u, weight):
         symbol = self.sym.symbolbitmex
         balance = u.balance() * weight
@@ -0,0 +1,369 @@
+"""Streaming versions of signals.py indicators for live candles
+- keep internal state, update in constant time (relative to history length) per new candle
+- update() commits a complete candle, peek() returns values for a partial candle without changing state
+- outputs are bit-compatible with the batch pandas/ta computation over the same candles
+"""
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from . import functions as f
+from . import signals as sg
+
+class StreamEWM():
+    """Mirrors s.ewm(span=span, adjust=adjust, min_periods=min_periods).mean()
+    - same operations and order as pandas' cython ewm loop, so float results match exactly
+    """
+    def __init__(self, span : int, adjust : bool=True, min_periods : int=0):
+        com = (span - 1) / 2.
+        alpha = 1. / (1. + com)
+        old_wt_factor = 1. - alpha
+        new_wt = 1. if adjust else alpha
+        min_periods = max(int(min_periods), 1)
+
+        n = 0
+        nobs = 0
+        weighted = np.nan
+        old_wt = 1.
+        f.set_self(vars())
+
+    def _next(self, cur):
+        """Return new state (weighted, old_wt, nobs) after cur, without setting it"""
+        weighted, old_wt, nobs = self.weighted, self.old_wt, self.nobs
+        is_observation = cur == cur
+
+        if self.n == 0:
+            return cur, 1., int(is_observation)
+
+        nobs += is_observation
+
+        if weighted == weighted:
+            old_wt *= self.old_wt_factor
+
+            if is_observation:
+                # pandas skips update on constant series to avoid numerical error
+                if weighted != cur:
+                    weighted = old_wt * weighted + self.new_wt * cur
+                    weighted /= (old_wt + self.new_wt)
+
+                old_wt = old_wt + self.new_wt if self.adjust else 1.
+        elif is_observation:
+            weighted = cur
+
+        return weighted, old_wt, nobs
+
+    def _out(self, weighted, nobs):
+        return weighted if nobs >= self.min_periods else np.nan
+
+    def update(self, cur : float) -> float:
+        self.weighted, self.old_wt, self.nobs = self._next(cur)
+        self.n += 1
+        return self._out(self.weighted, self.nobs)
+
+    def peek(self, cur : float) -> float:
+        weighted, _, nobs = self._next(cur)
+        return self._out(weighted, nobs)
+
+class StreamEMA(StreamEWM):
+    """Mirrors signals.add_ema, ta EMAIndicator(fillna=True) is ewm(span=p, min_periods=0, adjust=False)"""
+    def __init__(self, p : int):
+        super().__init__(span=p, adjust=False, min_periods=0)
+
+class StreamRolling():
+    """Mirrors s.rolling(window).max().shift(offset) (or min), with monotonic deque of (position, value)"""
+    def __init__(self, window : int, how : str='max', offset : int=0):
+        cmp = (lambda a, b: a >= b) if how == 'max' else (lambda a, b: a <= b)
+        agg = max if how == 'max' else min
+        extrema = deque() # candidates for current window extrema, front is current extrema
+        outs = deque(maxlen=offset + 1) # unshifted rolling values
+        n = 0
+        f.set_self(vars())
+
+    def update(self, x : float) -> float:
+        i, extrema = self.n, self.extrema
+
+        while extrema and self.cmp(x, extrema[-1][1]):
+            extrema.pop()
+
+        extrema.append((i, x))
+
+        if extrema[0][0] <= i - self.window:
+            extrema.popleft()
+
+        self.outs.append(extrema[0][1] if i + 1 >= self.window else np.nan)
+        self.n += 1
+
+        return self.outs[0] if len(self.outs) == self.offset + 1 else np.nan
+
+    def peek(self, x : float) -> float:
+        i, offset = self.n, self.offset
+
+        # shifted value is already committed
+        if offset > 0:
+            return self.outs[-offset] if len(self.outs) >= offset else np.nan
+
+        if i + 1 < self.window:
+            return np.nan
+
+        # first candidate still in window is max of previous window - 1 values
+        prev = [v for j, v in self.extrema if j > i - self.window][:1]
+        return self.agg([x] + prev)
+
+class StreamUlcer():
+    """Mirrors ta UlcerIndex(close, window, fillna=True).ulcer_index()
+    - recomputes only the last window values with the same numpy ops, constant time per candle
+    """
+    def __init__(self, window : int=14):
+        ui_max = StreamRolling(window=window, how='max') # rolling(window, min_periods=1).max()
+        r_i = deque(maxlen=window)
+        n = 0
+        last = 0. # ffill value for fillna
+        f.set_self(vars())
+
+    def _ui_max(self, close, peek=False):
+        # min_periods=1, so use current extrema deque regardless of how many candles
+        s = self.ui_max
+        if peek:
+            prev = [v for j, v in s.extrema if j > s.n - self.window][:1]
+            return max([close] + prev)
+
+        s.update(close)
+        return s.extrema[0][1]
+
+    def _ulcer(self, r_i, n):
+        if n < self.window:
+            val = np.nan
+        else:
+            x = np.array(r_i)
+            val = np.sqrt((x ** 2 / self.window).sum())
+
+        # fillna: inf > nan, ffill, then 0
+        if not np.isfinite(val):
+            val = self.last
+
+        return val
+
+    def update(self, close : float) -> float:
+        ui_max = self._ui_max(close)
+        self.r_i.append(100 * (close - ui_max) / ui_max)
+        self.n += 1
+
+        self.last = self._ulcer(self.r_i, self.n)
+        return self.last
+
+    def peek(self, close : float) -> float:
+        ui_max = self._ui_max(close, peek=True)
+        r_i = deque(self.r_i, maxlen=self.window)
+        r_i.append(100 * (close - ui_max) / ui_max)
+        return self._ulcer(r_i, self.n + 1)
+
+class GroupStream():
+    """Base for streaming version of a SignalGroup, returns dict of {col: value} per candle"""
+    cols = []
+
+    def update(self, c : dict) -> dict:
+        return self._calc(c, peek=False)
+
+    def peek(self, c : dict) -> dict:
+        return self._calc(c, peek=True)
+
+    def _step(self, stream, val, peek):
+        return stream.peek(val) if peek else stream.update(val)
+
+class EMAStream(GroupStream):
+    """Streaming signals.EMA, cols ema{fast}, ema{slow}, ema_spread, ema_trend, ema_conf, pxhigh, pxlow"""
+    def __init__(self, fast=50, slow=200, speed=(24, 18), offset=1):
+        group = sg.EMA(fast=fast, slow=slow, speed=speed, offset=offset)
+        against, wth, neutral = group.against, group.wth, group.neutral
+        colfast, colslow = group.colfast, group.colslow
+        cols = [colfast, colslow, 'ema_spread', 'ema_trend', 'ema_conf', 'pxhigh', 'pxlow']
+
+        ema_fast, ema_slow = StreamEMA(fast), StreamEMA(slow)
+
+        # same windows as EMA group's mhw/mha/mhn/mla/mlw/mln
+        roll = dict(
+            mhw=StreamRolling(wth, 'max', offset),
+            mha=StreamRolling(against, 'max', offset),
+            mhn=StreamRolling(neutral, 'max', offset),
+            mla=StreamRolling(wth, 'min', offset),
+            mlw=StreamRolling(against, 'min', offset),
+            mln=StreamRolling(neutral, 'min', offset))
+
+        f.set_self(vars())
+
+    def _calc(self, c, peek):
+        emafast = self._step(self.ema_fast, c['Close'], peek)
+        emaslow = self._step(self.ema_slow, c['Close'], peek)
+        m = {name: self._step(s, c['High'] if name.startswith('mh') else c['Low'], peek) for name, s in self.roll.items()}
+
+        spread = (emafast - emaslow) / ((emafast + emaslow) / 2)
+        trend = 1 if emafast > emaslow else -1
+
+        # use same vectorized func as batch so float ops match
+        conf = self.group.ema_exp(x=pd.Series([spread]), c=self.group.c).iloc[0]
+
+        return {
+            self.colfast: emafast,
+            self.colslow: emaslow,
+            'ema_spread': spread,
+            'ema_trend': trend,
+            'ema_conf': conf,
+            'pxhigh': m['mhn'] if trend == 0 else (m['mha'] if trend == 1 else m['mhw']),
+            'pxlow': m['mln'] if trend == 0 else (m['mlw'] if trend == -1 else m['mla'])}
+
+class MACDStream(GroupStream):
+    """Streaming signals.MACD, cols macd, macd_signal, macd_diff, macd_trend"""
+    cols = ['macd', 'macd_signal', 'macd_diff', 'macd_trend']
+
+    def __init__(self, fast=50, slow=200, smooth=50):
+        ema_fast, ema_slow = StreamEMA(fast), StreamEMA(slow)
+        ewm_signal = StreamEWM(span=smooth, adjust=True, min_periods=smooth)
+        f.set_self(vars())
+
+    def _calc(self, c, peek):
+        macd = self._step(self.ema_fast, c['Close'], peek) - self._step(self.ema_slow, c['Close'], peek)
+        signal = self._step(self.ewm_signal, macd, peek)
+        diff = macd - signal
+
+        return dict(
+            macd=macd,
+            macd_signal=signal,
+            macd_diff=diff,
+            macd_trend=1 if diff > 0 else -1)
+
+class VolatilityStream(GroupStream):
+    """Streaming signals.Volatility, cols vty_ulcer (+ vty_spread, vty_ema, norm_ema if norm)"""
+    def __init__(self, window=6, norm=None):
+        ulcer = StreamUlcer(window=window)
+        cols = ['vty_ulcer']
+
+        if not norm is None:
+            maxhigh, minlow = StreamRolling(48, 'max'), StreamRolling(48, 'min')
+            ewm_spread = StreamEWM(span=60, adjust=True, min_periods=60)
+            cols = cols + ['vty_spread', 'vty_ema', 'norm_ema']
+
+        f.set_self(vars())
+
+    def _calc(self, c, peek):
+        m = dict(vty_ulcer=self._step(self.ulcer, c['Close'], peek))
+
+        if not self.norm is None:
+            maxhigh = self._step(self.maxhigh, c['High'], peek)
+            minlow = self._step(self.minlow, c['Low'], peek)
+            spread = abs(maxhigh - minlow) / ((maxhigh + minlow) / 2)
+            vty_ema = self._step(self.ewm_spread, spread, peek)
+
+            m.update(
+                vty_spread=spread,
+                vty_ema=vty_ema,
+                norm_ema=np.interp(vty_ema, (0, 0.25), self.norm))
+
+        return m
+
+class EMASlopeStream(GroupStream):
+    """Streaming signals.EMASlope, cols ema10, ema50, ema10_slope, ema50_slope, ema50_slope_int
+    - batch np.roll wraps first slope candles around to end of df, stream has no values to compare to there (nan/-1)
+    """
+    def __init__(self, p=50, slope=5):
+        emas = {n: StreamEMA(n) for n in sorted({10, 50, p})}
+        prev = {n: deque(maxlen=slope) for n in emas} # last slope committed ema values
+        cols = [f'ema{n}' for n in emas] + ['ema10_slope', 'ema50_slope', 'ema50_slope_int']
+        f.set_self(vars())
+
+    def _calc(self, c, peek):
+        m = {f'ema{n}': self._step(s, c['Close'], peek) for n, s in self.emas.items()}
+
+        # value slope candles ago, only full once slope candles committed
+        before = {n: q[0] if len(q) == self.slope else np.nan for n, q in self.prev.items()}
+
+        if not peek:
+            for n, q in self.prev.items():
+                q.append(m[f'ema{n}'])
+
+        ema_p = m[f'ema{self.p}']
+
+        return {
+            **m,
+            'ema10_slope': (m['ema10'] - before[10]) / self.slope,
+            'ema50_slope': (m['ema50'] - before[50]) / self.slope,
+            'ema50_slope_int': 1 if before[self.p] < ema_p else -1}
+
+class SignalStream():
+    """Container of group streams for one symbol, adds streamed signal cols to live candle df
+    - fit() warms up state on df, transform() only processes candles after last fitted candle
+    - groups without a streaming version (batch_signals, eg Trend's ta indicators) are recomputed over the full df each transform
+    - streamed values continue from the first fitted candle, so once live window slides they differ from a batch
+        recompute over the new window only (emas/ewm start from a different first candle). They are the same values
+        a batch run over all candles since the first fitted candle would give.
+    """
+    def __init__(self, streams : list, batch_signals : list=None):
+        ts_last = None
+        batch_signals = batch_signals or []
+        f.set_self(vars())
+
+    @property
+    def cols(self) -> list:
+        # groups can share cols (eg ema50), values are the same
+        return list(dict.fromkeys(col for s in self.streams for col in s.cols))
+
+    def update(self, c : dict) -> dict:
+        return {k: v for s in self.streams for k, v in s.update(c).items()}
+
+    def peek(self, c : dict) -> dict:
+        return {k: v for s in self.streams for k, v in s.peek(c).items()}
+
+    def _process(self, df, partial=False) -> pd.DataFrame:
+        """Return df of signal cols for all candles in df, last candle only peeked if partial"""
+        cols_ohlc = {col: df[col].to_numpy() for col in ('High', 'Low', 'Close')}
+        data = []
+
+        for i in range(len(df)):
+            c = {col: arr[i] for col, arr in cols_ohlc.items()}
+            is_partial = partial and i == len(df) - 1
+            data.append(self.peek(c) if is_partial else self.update(c))
+
+        # partial candle isn't committed, so last processed candle is the one before it
+        if len(df) > int(partial):
+            self.ts_last = df.index[-2 if partial else -1]
+
+        return pd.DataFrame(data, index=df.index, columns=self.cols)
+
+    def fit(self, df, partial=False):
+        """Init state from all candles in df"""
+        self._process(df, partial=partial)
+        return self
+
+    def transform(self, df, df_prev=None, partial=False) -> pd.DataFrame:
+        """Add signal cols to df, only streaming candles after last processed candle
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            candles, eg new 15 day live window
+        df_prev : pd.DataFrame, optional
+            previous df with signal cols, used for candles already processed, required if stream has been fit
+        partial : bool, optional
+            last candle is partial, only peeked so it can be updated next time, default False
+
+        Returns
+        -------
+        pd.DataFrame
+        """
+        if self.ts_last is None:
+            i_new = 0
+            df_old = None
+        else:
+            i_new = df.index.searchsorted(self.ts_last, side='right')
+            df_old = df_prev[self.cols].reindex(df.index[:i_new])
+
+        df_new = self._process(df.iloc[i_new:], partial=partial)
+        df_signals = pd.concat([df_old, df_new]) if not df_old is None else df_new
+
+        df = df.drop(columns=[c for c in self.cols if c in df.columns]) \
+            .join(df_signals)
+
+        if self.batch_signals:
+            df = sg.SignalManager().add_signals(df=df, signals=self.batch_signals)
+
+        return df
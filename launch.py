@@ -105,7 +105,9 @@ if True:
 	# speed = (25, 18)
 	# norm = None
 	
-	syms = Parallel(n_jobs=-1)(delayed(op.run_single)(strattype, startdate, dfall, speed[0], speed[1], row, norm) for row in dfsym.itertuples())
+	# publish candles once to memmapped files, workers only attach to their own symbol
+	with op.SharedCandles(dfall=dfall) as shared:
+		syms = Parallel(n_jobs=-1)(delayed(op.run_single)(strattype, startdate, shared, speed[0], speed[1], row, norm) for row in dfsym.itertuples())
 
 	results = [sym.result() for sym in syms]
 	cmap = sns.diverging_palette(10, 240, sep=80, n=7, as_cmap=True)
@@ -143,9 +145,9 @@ if True:
 	for row in dfsym[dfsym.symbol==symbol].itertuples():		
 		if True:
 			# TREND_REV
-			strattype = 'trendrev'
 			norm = (0.004, 0.024)
-			syms = Parallel(n_jobs=-1)(delayed(op.run_single)(strattype, startdate, dfall, speed0, speed1, row, norm) for speed0 in range(6, 23, 1) for speed1 in range(6, 19, 1))
+			speed = (range(6, 23, 1), range(6, 19, 1))
+			dfResults = op.run_sweep(df=dfall, row=row, startdate=startdate, speeds0=speed[0], speeds1=speed[1], norm=norm)
 		
 		if False:
 			# TREND
@@ -170,14 +172,6 @@ if True:
 			# listout = Parallel(n_jobs=-1)(delayed(run_chop)(symbol, startdate, df, speed[0], speed[1], speedtp[0], speedtp[1], lowernorm, uppernorm, row, titles) for lowernorm in range(1, 25) for uppernorm in range(1, 25))
 
 		f.print_time(start)
-		
-		dfResults = pd.DataFrame(columns=[titles[0], titles[1], 'min', 'max', 'final', 'numtrades'])
-		for i, sym in enumerate(syms):
-			strat = sym.strats[0]
-			a = sym.account
-			speed = strat.speed
-
-			dfResults.loc[i] = [speed[0], speed[1], round(a.min,3), round(a.max,3), round(a.balance,3), strat.tradecount()]
 
 		size = 15
 		dims = (len(dfResults[titles[0]].unique()), len(dfResults[titles[1]].unique()))
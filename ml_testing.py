@@ -88,7 +88,7 @@ if True:
 
 # %% - ADD SIGNALS
 
-sm = sg.SignalManager()
+sm = sg.SignalManager(cache=True) # reuse signal cols computed in previous sessions
 
 n_periods = 6
 p_ema = None # 6